@@ -8,10 +8,57 @@ import numpy as np
 import tensorflow as tf
 import time
 
-from multiG import multiG 
+from multiG import multiG
 import model2 as model
 
 
+def load_index_triples(KG, filename, splitter='@@@', line_end='\n'):
+    '''Read a held-out triple file into an int64 [n, 3] array of KG indices.
+    Triples with an entity or relation unknown to the KG are skipped.'''
+    rows = []
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip(line_end).split(splitter)
+            if len(parts) < 3:
+                continue
+            h, r, t = KG.ent_str2index(parts[0]), KG.rel_str2index(parts[1]), KG.ent_str2index(parts[2])
+            if h is not None and r is not None and t is not None:
+                rows.append((h, r, t))
+    return np.array(rows, dtype=np.int64).reshape(-1, 3)
+
+
+def _pool_distances(q, pool, L1, block=1024):
+    '''TransE distances ||q_i - pool_j|| (squared for L2) for a [n, m] grid, in row blocks.'''
+    out = np.empty((len(q), len(pool)), dtype=np.float32)
+    pp = np.einsum('ij,ij->i', pool, pool)
+    for i in range(0, len(q), block):
+        qb = q[i:i + block]
+        if L1:
+            out[i:i + block] = np.abs(qb[:, None, :] - pool[None, :, :]).sum(axis=2)
+        else:
+            out[i:i + block] = np.einsum('ij,ij->i', qb, qb)[:, None] - 2 * qb.dot(pool.T) + pp
+    return out
+
+
+def l2_normalize(x, eps=1e-12):
+    '''Row-wise numpy twin of tf.nn.l2_normalize(x, 1).'''
+    return x / np.sqrt(np.maximum(np.einsum('ij,ij->i', x, x), eps))[:, None]
+
+
+def sampled_mrr(ent, rel, triples, pool, L1=False):
+    '''MRR of the true head and tail of every triple, each ranked against the
+    same fixed candidate pool (entity indices) instead of all entities.'''
+    h, r, t = triples[:, 0], triples[:, 1], triples[:, 2]
+    rr = []
+    for q, gold in ((ent[h] + rel[r], t), (ent[t] - rel[r], h)):
+        d =_pool_distances(q, ent[pool], L1)
+        diff = q - ent[gold]
+        gold_d = np.abs(diff).sum(axis=1) if L1 else np.einsum('ij,ij->i', diff, diff)
+        closer = (d < gold_d[:, None]) & (pool[None, :] != gold[:, None])
+        rr.append(1.0 / (1 + closer.sum(axis=1)))
+    return float(np.mean(np.concatenate(rr)))
+
+
 class Trainer(object):
     def __init__(self):
         self.batch_sizeK=1024
@@ -206,11 +253,48 @@ class Trainer(object):
                 loss_AM = self.train1epoch_AM(sess, num_AM_batch, a1, a2, lr, epoch)
         return (loss_KM, loss_AM)
 
-    def train_MTransE(self, epochs=20, save_every_epoch=10, lr=0.001, a1=0.1, a2=0.05, m1=0.5, AM_fold=1, half_loss_per_epoch=-1):
+    def validate(self, valid, pools):
+        '''Sampled MRR over the validation triples of both KGs (see sampled_mrr).
+        Entity rows are unit-normalised first, as in the KM loss (_ht1_norm /
+        _ht2_norm); relation vectors are used as they are.'''
+        parts = [(self.tf_parts._ht1, self.tf_parts._r1), (self.tf_parts._ht2, self.tf_parts._r2)]
+        mrr, n = 0., 0
+        for kg_index, (ent_var, rel_var) in zip((1, 2), parts):
+            triples = valid.get(kg_index)
+            if triples is None or len(triples) == 0:
+                continue
+            ent, rel = self.sess.run([ent_var, rel_var])
+            mrr += sampled_mrr(l2_normalize(ent), rel, triples, pools[kg_index], self.L1) * len(triples)
+            n += len(triples)
+        return mrr / max(n, 1)
+
+    def _save(self, with_multiG=True):
+        this_save_path = self.tf_parts._saver.save(self.sess, self.save_path)
+        if with_multiG:
+            self.multiG.save(self.multiG_save_path)
+            print("MTransE saved in file: %s. Multi-graph saved in file: %s" % (this_save_path, self.multiG_save_path))
+        else:
+            print("MTransE saved in file: %s" % this_save_path)
+
+    def train_MTransE(self, epochs=20, save_every_epoch=10, lr=0.001, a1=0.1, a2=0.05, m1=0.5, AM_fold=1, half_loss_per_epoch=-1,
+                      valid=None, eval_every=5, patience=3, num_candidates=1000, valid_sample=2000, seed=0):
+        '''valid: optional {1: [n, 3], 2: [n, 3]} index triples (see load_index_triples).
+        With validation data the sampled MRR is computed every `eval_every` epochs,
+        only improving epochs are saved, and training stops after `patience`
+        evaluations without improvement.'''
         #sess = tf.Session()
         #sess.run(tf.initialize_all_variables())
-        self.tf_parts._m1 = m1  
+        self.tf_parts._m1 = m1
         t0 = time.time()
+        if valid:
+            # fixed candidate pools and validation subset, so evaluations are comparable
+            rng = np.random.RandomState(seed)
+            valid, pools = dict(valid), {}
+            for kg_index, KG in ((1, self.multiG.KG1), (2, self.multiG.KG2)):
+                pools[kg_index] = rng.choice(KG.num_ents(), min(num_candidates, KG.num_ents()), replace=False)
+                if valid.get(kg_index) is not None and len(valid[kg_index]) > valid_sample:
+                    valid[kg_index] = valid[kg_index][rng.choice(len(valid[kg_index]), valid_sample, replace=False)]
+            best_mrr, best_epoch, bad_evals = -1., -1, 0
         for epoch in range(epochs):
             if half_loss_per_epoch > 0 and (epoch + 1) % half_loss_per_epoch == 0:
                 lr /= 2.
@@ -219,12 +303,25 @@ class Trainer(object):
             if np.isnan(epoch_lossKM) or np.isnan(epoch_lossAM):
                 print("Training collapsed.")
                 return
-            if (epoch + 1) % save_every_epoch == 0:
-                this_save_path = self.tf_parts._saver.save(self.sess, self.save_path)
-                self.multiG.save(self.multiG_save_path)
-                print("MTransE saved in file: %s. Multi-graph saved in file: %s" % (this_save_path, self.multiG_save_path))
-        this_save_path = self.tf_parts._saver.save(self.sess, self.save_path)
-        print("MTransE saved in file: %s" % this_save_path)
+            if valid:
+                if (epoch + 1) % eval_every and epoch != epochs - 1:
+                    continue
+                mrr = self.validate(valid, pools)
+                print("Sampled valid MRR of epoch %d: %.4f (best %.4f at epoch %d)" % (epoch, mrr, best_mrr, best_epoch))
+                if mrr > best_mrr:
+                    best_mrr, best_epoch, bad_evals = mrr, epoch, 0
+                    self._save()
+                else:
+                    bad_evals += 1
+                    if bad_evals >= patience:
+                        print("Early stopping: no improvement in %d evaluations." % patience)
+                        break
+            elif (epoch + 1) % save_every_epoch == 0:
+                self._save()
+        if valid:
+            print("Best checkpoint: epoch %d, sampled valid MRR %.4f, in file: %s" % (best_epoch, best_mrr, self.save_path))
+        else:
+            self._save(with_multiG=False)
         print("Done")
 
 # A safer loading is available in Tester, with parameters like batch_size and dim recorded in the corresponding Data component
@@ -10,6 +10,19 @@ Changes at a glance
 2. **Alignment weight is 0** and **`AM_fold = 0`** when calling `train_MTransE`.
    This disables the AM optimiser while leaving the rest of the training loop
    untouched.
+3. **Optional entity reindexing** (`ent_order`, 7th CLI argument: `degree` or
+   `bfs`) renumbers entities after loading for better gather locality; see
+   `kg_reorder.py`. Default `None` keeps file-encounter order.
+4. **Optional early stopping** (`validf1` / `validf2`, 8th and 9th CLI
+   arguments, `-` to skip one): held-out triples of each graph are ranked
+   against a fixed random candidate pool every `eval_every` epochs; only the
+   best checkpoint is kept and training stops after `patience` evaluations
+   without improvement.
+5. **Optional save cadence** (`save_every`, 10th CLI argument): without
+   validation triples a checkpoint is written every `save_every` epochs
+   (default 100, i.e. only at the end). Lower it, e.g. to 5, when
+   `link_prediction.py --watch` runs next to training, so the watcher has
+   intermediate checkpoints to evaluate.
 
 Everything else – batch sizes, random seeds, path variables – is preserved.
 """
@@ -28,7 +41,8 @@ import tensorflow as tf  # noqa: F401
 from KG import KG
 from multiG import multiG
 import model2 as model  # noqa: F401  (not referenced directly but left intact)
-from trainer2 import Trainer
+from trainer2_no_alignment import Trainer, load_index_triples
+from kg_reorder import reorder_entities
 
 # -----------------------------------------------------------------------------
 # Path and hyper‑parameter definitions (unchanged)
@@ -40,6 +54,10 @@ kgf2 = 'preprocess/wk3l_60k/structure/de_60k.csv'
 alignf = 'preprocess/wk3l_60k/alignment/en_de_60k_train25.csv'  # kept but UNUSED
 
 this_dim = 50
+ent_order = None  # None | 'degree' | 'bfs'
+validf1 = None    # held-out KG1 triples for early stopping (None: train all epochs)
+validf2 = None
+save_every = 100  # epochs between checkpoints without validation triples
 
 # Allow CLI overrides (same order as before)
 if len(sys.argv) > 1:
@@ -49,6 +67,14 @@ if len(sys.argv) > 1:
     kgf1 = sys.argv[4]
     kgf2 = sys.argv[5]
     alignf = sys.argv[6]  # still parsed but we will not load it
+if len(sys.argv) > 7:
+    ent_order = sys.argv[7]
+if len(sys.argv) > 8:
+    validf1 = None if sys.argv[8] == '-' else sys.argv[8]
+if len(sys.argv) > 9:
+    validf2 = None if sys.argv[9] == '-' else sys.argv[9]
+if len(sys.argv) > 10:
+    save_every = int(sys.argv[10])
 
 # -----------------------------------------------------------------------------
 # Load the two monolingual graphs
@@ -56,6 +82,15 @@ if len(sys.argv) > 1:
 KG1, KG2 = KG(), KG()
 KG1.load_triples(filename=kgf1, splitter='@@@', line_end='\n')
 KG2.load_triples(filename=kgf2, splitter='@@@', line_end='\n')
+reorder_entities(KG1, ent_order)
+reorder_entities(KG2, ent_order)
+
+# Validation triples (after reindexing, so they use the final entity indices)
+valid = {}
+if validf1:
+    valid[1] = load_index_triples(KG1, validf1, splitter='@@@', line_end='\n')
+if validf2:
+    valid[2] = load_index_triples(KG2, validf2, splitter='@@@', line_end='\n')
 
 # Bundle them; **do NOT add alignment pairs**
 this_data = multiG(KG1, KG2)
@@ -82,10 +117,13 @@ m_train.build(this_data,
 # Train **without alignment**
 # -----------------------------------------------------------------------------
 m_train.train_MTransE(epochs=100,
-                      save_every_epoch=100,
+                      save_every_epoch=save_every,
                       lr=0.001,
                       a1=0.0,      # <-- alignment weight OFF
                       a2=0.5,
                       m1=0.5,
                       AM_fold=0,   # <-- skip AM batches
-                      half_loss_per_epoch=150)
+                      half_loss_per_epoch=150,
+                      valid=valid or None,  # early stopping only with validation triples
+                      eval_every=5,
+                      patience=3)
@@ -6,6 +6,32 @@ Append cosine(subject, object) to each triple line.
 Supports both label-only and description-rich formats.
 Skips header row if detected.
 
+--metrics appends any of these columns, in the given order, in one pass
+(the entity and relation tables are loaded once):
+    cos     cosine(h, t)                      (default)
+    transe  ||h + r − t||, L1 or L2 as the checkpoint was trained (multiG.L1)
+    l1      ||h + r − t||_1
+    l2      ||h + r − t||_2
+
+Rows are scored in batches of --chunk: entity norms are computed once, the
+subject/object indices of a whole chunk are resolved together, the row-wise
+dot products are one NumPy operation and the chunk is written in bulk. Text
+I/O is bulk too: lines are read raw and split once, every score column is
+formatted by a single `%` over the chunk, and each output row is its input
+line joined with its cells (`triple_io.append_columns`), with the cyclic GC
+paused for the pass. On a 60k-row descriptions TSV a --no-cache cosine run
+takes about 0.73 s instead of 1.9 s with per-row csv I/O, i.e. about 2.6×
+faster. Most of the remaining time is Python string splitting and joining.
+
+Cosine scores are cached on disk (--cache-dir, see sim_cache.py) keyed by
+checkpoint fingerprint, language and (subject, object) entity index: a rerun
+only scores pairs it has not seen, and loads the checkpoint only if there are
+any (or if a relation metric is requested).
+
+If an `embedding_server.py` is running (--server / $EMB_SERVER), entity
+resolution and scoring are delegated to it and nothing is loaded here;
+otherwise the checkpoint is loaded in-process.
+
 Example usage:
 python append_cosine.py \
     --ckpt    test-model-m2-no-alignment-wk5m60k-en-ru.ckpt \
@@ -21,32 +47,28 @@ python append_cosine.py  \
   --data    test-multiG-m2-no-alignment-wk5m60k-en-ru.bin \
   --triples wikidata5m_top200_ru_42k_labels.tsv \
   --out     triples_42K_ru_with_cos_labels.tsv \
-  --lang    ru
+  --lang    ru \
+  --metrics cos,transe
 """
 
 from __future__ import annotations
-import argparse, csv, sys, importlib.util, re
+import argparse
 from pathlib import Path
-import numpy as np, tensorflow as tf
-
-# ── helper to load repo modules from ./src ---------------------------------
-def load_module(py_path: Path, name: str):
-    spec = importlib.util.spec_from_file_location(name, str(py_path))
-    m = importlib.util.module_from_spec(spec); spec.loader.exec_module(m)
-    sys.modules[name] = m; return m
-
-# ── canonicalise label -----------------------------------------------------
-_quote_re = re.compile(r"[\"“”„‟‶‷❝❞«»‹›]")
-_ws_re    = re.compile(r"\s+")
-
-def canon(label: str) -> str:
-    """lower-case, strip all quotes, normalise whitespace"""
-    s = _quote_re.sub("", label)
-    s = _ws_re.sub(" ", s).strip().lower()
-    return s
-
-def cosine(a: np.ndarray, b: np.ndarray) -> float:
-    return float(np.dot(a,b) / (np.linalg.norm(a)*np.linalg.norm(b)+1e-8))
+import numpy as np
+
+from checkpoint_cache import ModelCache, kg_of
+from embedding_server import connect
+from entity_ids import QidIndex, relation_key, triple_keys
+from label_lookup import LabelIndex, relation_index
+from scoring import METRICS, REL_METRICS, row_norms, score as metric_score
+from sim_cache import SimCache
+from triple_io import append_columns, line_chunks, no_gc
+
+def format_column(vals, mask, n):
+    """'%.6f' cells of one metric column ('NaN' where mask is False), formatted in one call."""
+    full = np.full(n, np.nan)
+    full[mask] = vals
+    return ("%.6f\t" * n % tuple(full.tolist()))[:-1].replace("nan", "NaN").split("\t")
 
 # ── CLI --------------------------------------------------------------------
 def cli(argv=None):
@@ -57,83 +79,112 @@ def cli(argv=None):
     p.add_argument("--out", required=True)
     p.add_argument("--lang", required=True, choices=["en", "de", "ru"])
     p.add_argument("--srcdir", default="src")
-    return p.parse_args(argv)
+    p.add_argument("--chunk", type=int, default=8192,
+                   help="rows scored per batch (larger chunks only grow the heap; measured slower)")
+    p.add_argument("--key", default="label", choices=["label", "qid"],
+                   help="match entities by label (default) or by Q-id "
+                        "(checkpoints trained on convert_for_mTransE_csv.py --ids)")
+    p.add_argument("--metrics", default="cos",
+                   help=f"comma-separated columns to append, any of {','.join(METRICS)}")
+    p.add_argument("--server", default=None,
+                   help="embedding_server.py URL (default: $EMB_SERVER or http://127.0.0.1:8765); "
+                        "'off' always loads the checkpoint in-process")
+    p.add_argument("--cache-dir", default=".sim_cache", help="on-disk similarity cache")
+    p.add_argument("--no-cache", action="store_true", help="score every pair, bypass the cache")
+    a = p.parse_args(argv)
+    a.metrics = [m.strip() for m in a.metrics.split(",") if m.strip()]
+    bad = [m for m in a.metrics if m not in METRICS]
+    if bad or not a.metrics:
+        p.error(f"--metrics: unknown {bad}; choose from {','.join(METRICS)}")
+    return a
 
 # ── main -------------------------------------------------------------------
 def main(argv=None):
     a = cli(argv)
 
-    SRC = Path(a.srcdir)
-    load_module(SRC/"KG.py","KG")
-    load_module(SRC/"multiG.py","multiG")
-    load_module(SRC/"model2.py","model2")
-    load_module(SRC/"trainer2.py","trainer2")
-    Tester = load_module(SRC/"tester_MTransE2.py","tester_MTransE2").Tester
-
-    tester = Tester()
-    tester.build(save_path=a.ckpt, data_save_path=a.data)
-
-    vec_en, vec_de = tester.vec_e[1], tester.vec_e[2]
-
-    # build canonical lookup tables ----------------------------------------
-    id2idx_en, id2idx_de = {}, {}
-    for i in range(len(vec_en)):
-        lbl = tester.ent_index2str(i, 1)
-        id2idx_en[lbl] = id2idx_en[canon(lbl)] = i
-    for i in range(len(vec_de)):
-        lbl = tester.ent_index2str(i, 2)
-        id2idx_de[lbl] = id2idx_de[canon(lbl)] = i
-
-    def vec_by_label(lbl: str, lang: str):
-        c = canon(lbl)
-        if lang == "en":
-            idx = id2idx_en.get(lbl) or id2idx_en.get(c)
-            return None if idx is None else vec_en[idx]
-        idx = id2idx_de.get(lbl) or id2idx_de.get(c)
-        return None if idx is None else vec_de[idx]
-
-    missing = 0
+    kg = kg_of(a.lang)
+    need_rel = any(m in REL_METRICS for m in a.metrics)
+    sc = None if a.no_cache else SimCache(a.cache_dir, a.ckpt, a.data)
+    client = connect(a.server)                     # resident embedding_server.py, if running
+
+    if client:
+        def resolve(keys, kind="entity"):
+            return client.resolve(a.ckpt, a.data, a.lang, keys, a.key, kind)
+
+        def score(metric, s_idx, r_idx, o_idx):
+            return client.score(a.ckpt, a.data, a.lang, metric, s_idx, o_idx, r_idx)
+    else:
+        models = ModelCache(a.srcdir)
+        labels = sc.labels(a.lang) if sc and not need_rel else None
+        if labels is None:
+            labels = models.get(a.ckpt, a.data).labels[kg]
+            if sc:
+                sc.save_labels(a.lang, labels)
+        index = QidIndex(labels) if a.key == "qid" else LabelIndex(labels)
+        rel_index = relation_index(models.get(a.ckpt, a.data), kg, a.key) if need_rel else None
+
+        def resolve(keys, kind="entity"):
+            return (rel_index if kind == "relation" else index).resolve(keys)
+
+        tables = {}
+        def score(metric, s_idx, r_idx, o_idx):
+            if not tables:                           # checkpoint only needed on a cache miss
+                snap = models.get(a.ckpt, a.data)
+                tables.update(vec=snap.vec_e[kg], norms=row_norms(snap.vec_e[kg]),
+                              rvec=snap.vec_r.get(kg), L1=snap.L1)
+            return metric_score(metric, tables["vec"], tables["norms"], tables["rvec"], tables["L1"],
+                                s_idx, o_idx, r_idx)
+
+    def cosine(s_ok, o_ok):
+        if not sc:
+            return score("cos", s_ok, None, o_ok)
+        sims, hit = sc.lookup("cos", a.lang, s_ok, o_ok)
+        if not hit.all():
+            sims[~hit] = score("cos", s_ok[~hit], None, o_ok[~hit])
+            sc.add("cos", a.lang, s_ok[~hit], o_ok[~hit], sims[~hit])
+        return sims
+
+    missing = rel_missing = 0
     with Path(a.triples).open(encoding="utf-8") as fin, \
-         Path(a.out).open("w", encoding="utf-8", newline="") as fout:
-
-        rdr = csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE)
-        wtr = csv.writer(fout, delimiter="\t")
+         Path(a.out).open("w", encoding="utf-8", newline="") as fout, no_gc():
 
-        # Detect and skip header row
-        first_row = next(rdr)
-        if first_row[:2] == ["subject_id", "subject_label"]:
+        chunks, skipped = line_chunks(fin, a.chunk)
+        if skipped:
             print("⚙️  Detected and skipped header row.")
-        else:
-            fin.seek(0)
-            rdr = csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE)
-
-        for row in rdr:
-            if len(row) == 6:
-                subj_label = row[1]
-                obj_label = row[5]
-            elif len(row) == 8:
-                subj_label = row[1]
-                obj_label = row[5]
-            elif len(row) == 3:  # fallback: subject, relation, object only
-                subj_label = row[0]
-                obj_label  = row[2]
-            else:
-                wtr.writerow(row + ["NaN"])
-                continue
-
-            vs = vec_by_label(subj_label, a.lang)
-            vo = vec_by_label(obj_label,  a.lang)
-
-            if vs is None or vo is None:
-                missing += 1
-                wtr.writerow(row + ["NaN"])
-            else:
-                sim = cosine(vs, vo)
-                wtr.writerow(row + [f"{sim:.6f}"])
-
-    print(f"✅ wrote {a.out}")
+
+        for lines, rows in chunks:
+            # 6/8 columns: labels or descriptions file; 3 columns: subject, relation, object only
+            valid = np.fromiter((len(row) in (3, 6, 8) for row in rows), dtype=bool, count=len(rows))
+            keys = [triple_keys(row, a.key) if ok else ("", "") for row, ok in zip(rows, valid)]
+            s_idx, s_found = resolve([k[0] for k in keys])
+            o_idx, o_found = resolve([k[1] for k in keys])
+            ok = valid & s_found & o_found
+            missing += int(np.count_nonzero(valid & ~ok))
+
+            if need_rel:
+                r_idx, r_found = resolve([relation_key(row, a.key) if v else ""
+                                          for row, v in zip(rows, valid)], "relation")
+                rel_ok = ok & r_found
+                rel_missing += int(np.count_nonzero(ok & ~r_found))
+
+            columns = []
+            for metric in a.metrics:
+                if metric == "cos":
+                    mask, vals = ok, cosine(s_idx[ok], o_idx[ok])
+                else:
+                    mask = rel_ok
+                    vals = score(metric, s_idx[mask], r_idx[mask], o_idx[mask])
+                columns.append(format_column(vals, mask, len(rows)))
+            fout.write(append_columns(lines, rows, columns))
+
+    if sc:
+        sc.save()
+        print(f"🗃️  similarity cache: {sc.hits}/{sc.lookups} pairs hit ({100 * sc.hit_rate:.1f}%)")
+    print(f"✅ wrote {a.out} ({', '.join(a.metrics)})")
     if missing:
         print(f"⚠️  {missing} triples had missing embeddings (NaN)")
+    if rel_missing:
+        print(f"⚠️  {rel_missing} triples had an unknown relation (NaN in {', '.join(sorted(REL_METRICS & set(a.metrics)))})")
 
 
 if __name__ == "__main__":
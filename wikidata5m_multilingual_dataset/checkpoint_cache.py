@@ -0,0 +1,139 @@
+"""
+checkpoint_cache.py
+──────────────────────────────────────────────────────
+Load-once cache for MTransE checkpoints.
+
+The repo modules (KG / multiG / model2 / trainer2 / tester_MTransE2) are
+imported once per `srcdir`, and every (ckpt, data) pair is built into a
+`Tester` exactly once. Only what the analysis scripts need is kept
+resident — the `vec_e` tables and the entity label tables — in a small
+LRU; the Tester and its TF session are dropped right after loading.
+
+    cache = ModelCache(srcdir="src")
+    snap  = cache.get("test-model-...-en-de.ckpt", "test-multiG-...-en-de.bin")
+    vec   = snap.vec("de")                 # == tester.vec_e[2]
+    lbl   = snap.ent_index2str(0, 2)       # == tester.ent_index2str(0, 2)
+
+`run_parallel` fans independent per-language jobs out over threads; the
+checkpoint loads themselves are serialised by the cache lock.
+"""
+
+import importlib.util, sys, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+# ── Dynamic module loader from repo ──
+def load_module(py_path: Path, name: str):
+    spec = importlib.util.spec_from_file_location(name, str(py_path))
+    m = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(m)
+    sys.modules[name] = m
+    return m
+
+
+_testers = {}
+
+def load_tester_class(srcdir="src"):
+    """Import the MTransE modules from `srcdir` once and return `Tester`."""
+    src = Path(srcdir).resolve()
+    if src not in _testers:
+        load_module(src / "KG.py", "KG")
+        load_module(src / "multiG.py", "multiG")
+        load_module(src / "model2.py", "model2")
+        load_module(src / "trainer2.py", "trainer2")
+        _testers[src] = load_module(src / "tester_MTransE2.py", "tester_MTransE2").Tester
+    return _testers[src]
+
+
+def kg_of(lang: str) -> int:
+    """KG1 is always English; KG2 is the second language of the checkpoint."""
+    return 1 if lang.startswith("en") else 2
+
+
+class Snapshot:
+    """Resident, read-only view of one trained checkpoint."""
+
+    def __init__(self, ckpt, data, vec_e: dict, labels: dict, vec_r=None, rel_labels=None, L1=False):
+        self.ckpt, self.data = str(ckpt), str(data)
+        self.vec_e = vec_e                     # {1: [N1, d], 2: [N2, d]}
+        self.labels = labels                   # {1: [N1 labels], 2: [N2 labels]}
+        self.vec_r = vec_r or {}               # {1: [R1, d], 2: [R2, d]}
+        self.rel_labels = rel_labels or {}     # {1: [R1 labels], 2: [R2 labels]}
+        self.L1 = L1                           # distance the model was trained with
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_tester(cls, tester, ckpt, data):
+        vec_e = {kg: tester.vec_e[kg] for kg in (1, 2)}
+        labels = {kg: [tester.ent_index2str(i, kg) for i in range(len(vec_e[kg]))]
+                  for kg in (1, 2)}
+        vec_r = {kg: tester.vec_r[kg] for kg in (1, 2)}
+        rel_labels = {kg: [tester.rel_index2str(i, kg) for i in range(len(vec_r[kg]))]
+                      for kg in (1, 2)}
+        return cls(ckpt, data, vec_e, labels, vec_r, rel_labels, L1=tester.multiG.L1)
+
+    def vec(self, lang: str):
+        return self.vec_e[kg_of(lang)]
+
+    def ent_index2str(self, i: int, kg: int):
+        return self.labels[kg][i]
+
+    def derived(self, name, build):
+        """Memoise a lookup table derived from this snapshot (built once)."""
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = build()
+            return self._derived[name]
+
+    @property
+    def nbytes(self):
+        return sum(v.nbytes for v in list(self.vec_e.values()) + list(self.vec_r.values()))
+
+
+class ModelCache:
+    """LRU of `Snapshot`s keyed by (ckpt, data)."""
+
+    def __init__(self, srcdir="src", capacity=2):
+        self.srcdir = srcdir
+        self.capacity = capacity
+        self._snaps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ckpt, data) -> Snapshot:
+        key = (str(ckpt), str(data))
+        with self._lock:
+            if key in self._snaps:
+                self._snaps.move_to_end(key)
+                return self._snaps[key]
+            snap = self._load(*key)
+            self._snaps[key] = snap
+            while len(self._snaps) > self.capacity:
+                old, _ = self._snaps.popitem(last=False)
+                print(f"♻️  evicted {old[0]} from model cache")
+            return snap
+
+    @property
+    def loaded(self):
+        """(ckpt, data) keys currently resident, least recently used first."""
+        with self._lock:
+            return list(self._snaps)
+
+    def _load(self, ckpt, data) -> Snapshot:
+        import tensorflow as tf
+        Tester = load_tester_class(self.srcdir)
+        tester = Tester()
+        # fresh graph per checkpoint so several models can live in one process
+        with tf.Graph().as_default():
+            tester.build(save_path=ckpt, data_save_path=data)
+        snap = Snapshot.from_tester(tester, ckpt, data)
+        print(f"📦 loaded {ckpt} ({snap.nbytes / 2**20:.1f} MiB vec_e + vec_r)")
+        return snap
+
+
+def run_parallel(fn, jobs, workers=None):
+    """Run fn(**job) for every job dict in a thread pool; results in job order."""
+    with ThreadPoolExecutor(max_workers=workers or len(jobs) or 1) as pool:
+        return list(pool.map(lambda job: fn(**job), jobs))
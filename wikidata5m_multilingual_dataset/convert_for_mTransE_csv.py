@@ -3,34 +3,69 @@ Example usage:
 python convert_for_mTransE_csv.py --lang en
 python convert_for_mTransE_csv.py --lang de
 python convert_for_mTransE_csv.py --lang ru
+
+ID-keyed variant (Q-id triples + label/description side tables):
+python convert_for_mTransE_csv.py --lang en --ids
 """
 
 import argparse
 from pathlib import Path
 
-def convert_to_triples_csv(lang: str):
+from entity_ids import write_side_table
+
+def convert_to_triples_csv(lang: str, ids: bool = False):
     prefix = f"wikidata5m_top200_{lang}_60k"
     labels_path = Path(f"{prefix}_labels.tsv")
-    output_csv = Path(f"{prefix}_triples.csv")
+    output_csv = Path(f"{prefix}_triples_qid.csv" if ids else f"{prefix}_triples.csv")
 
     if not labels_path.exists():
         print(f"Labels file not found: {labels_path}")
         return
 
+    entities, relations = {}, {}
     with labels_path.open("r", encoding="utf-8") as fin, \
          output_csv.open("w", encoding="utf-8") as fout:
         for line in fin:
             parts = line.strip().split("\t")
             if len(parts) != 6:
                 continue
-            subj_label, rel_label, obj_label = parts[1], parts[3], parts[5]
-            fout.write(f"{subj_label}@@@{rel_label}@@@{obj_label}\n")
+            subj_id, subj_label, rel_id, rel_label, obj_id, obj_label = parts
+            if ids:
+                fout.write(f"{subj_id}@@@{rel_id}@@@{obj_id}\n")
+                entities.setdefault(subj_id, (subj_label, None))
+                entities.setdefault(obj_id, (obj_label, None))
+                relations.setdefault(rel_id, (rel_label, None))
+            else:
+                fout.write(f"{subj_label}@@@{rel_label}@@@{obj_label}\n")
 
     print(f"Saved: {output_csv}")
+    if not ids:
+        return
+
+    # descriptions are optional: only the 60k descriptions file has them
+    descr_path = Path(f"{prefix}_descriptions.tsv")
+    if descr_path.exists():
+        with descr_path.open("r", encoding="utf-8") as fin:
+            next(fin, None)                                   # header
+            for line in fin:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) < 8:
+                    continue
+                for qid, label, desc in ((parts[0], parts[1], parts[6]),
+                                         (parts[4], parts[5], parts[7])):
+                    if qid in entities:
+                        entities[qid] = (label, desc)
+
+    write_side_table(Path(f"{prefix}_entities.tsv"), entities)
+    write_side_table(Path(f"{prefix}_relations.tsv"), relations, with_desc=False)
+    print(f"Saved: {prefix}_entities.tsv ({len(entities)} entities)")
+    print(f"Saved: {prefix}_relations.tsv ({len(relations)} relations)")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--lang", required=True, help="Language code: en, de, ru")
+    parser.add_argument("--ids", action="store_true",
+                        help="Write Q-id triples plus label/description side tables")
     args = parser.parse_args()
 
-    convert_to_triples_csv(args.lang)
\ No newline at end of file
+    convert_to_triples_csv(args.lang, args.ids)
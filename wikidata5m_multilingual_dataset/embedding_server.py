@@ -0,0 +1,235 @@
+"""
+embedding_server.py
+──────────────────────────────────────────────────────
+Resident embedding query daemon on localhost.
+
+Loads checkpoints once (TensorFlow import, repo modules, `Tester.build`) and
+answers batched JSON requests, so the analysis scripts skip all of that on
+every run:
+
+    POST /resolve  {ckpt, data, lang, keys, key, kind}       → {idx}           (-1 = missing)
+    POST /vectors  {ckpt, data, lang, keys, key}             → {idx, dtype, shape, b64}
+    POST /table    {ckpt, data, lang}                        → {dtype, shape, b64}   (whole vec_e)
+    POST /score    {ckpt, data, lang, metric, s, o, [r]}     → {scores}        (cos / transe / l1 / l2)
+    POST /knn      {ckpt, data, src, tgt, keys, k, metric}   → {queries, neighbours, scores}
+    GET  /health                                             → {models}
+
+`ckpt`/`data` pairs not loaded yet are loaded on first use (LRU of
+--capacity checkpoints). Clients use `connect()`: it returns an
+`EmbeddingClient` when a server answers on $EMB_SERVER (default
+http://127.0.0.1:8765) and None otherwise, in which case the caller loads
+the checkpoint in-process as before. `RemoteIndex` is the `LabelIndex`
+counterpart on the client side (resolve / gather through the server).
+
+/knn answers with the resolved source labels (`queries`), i.e. the KG's own
+spelling of each found key, which is what `knn.py` writes in-process too.
+
+python embedding_server.py --model test-model-m2-no-alignment-wk5m60k-en-de.ckpt:test-multiG-m2-no-alignment-wk5m60k-en-de.bin \
+                           --model test-model-m2-no-alignment-wk5m60k-en-ru.ckpt:test-multiG-m2-no-alignment-wk5m60k-en-ru.bin
+"""
+
+import argparse, base64, json, os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+from checkpoint_cache import ModelCache, kg_of
+from knn import neighbours
+from label_lookup import entity_index, relation_index
+from scoring import METRICS, row_norms, score
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+# ── server side ------------------------------------------------------------------
+class Engine:
+    """The request handlers' view of a `ModelCache`; all inputs are batches."""
+
+    def __init__(self, srcdir="src", capacity=2):
+        self.models = ModelCache(srcdir, capacity)
+
+    def _index(self, ckpt, data, lang, key="label", kind="entity"):
+        snap = self.models.get(ckpt, data)
+        lookup = relation_index if kind == "relation" else entity_index
+        return snap, lookup(snap, kg_of(lang), key)
+
+    def resolve(self, ckpt, data, lang, keys, key="label", kind="entity"):
+        _, index = self._index(ckpt, data, lang, key, kind)
+        return {"idx": index.resolve(keys)[0].tolist()}
+
+    def vectors(self, ckpt, data, lang, keys, key="label"):
+        snap, index = self._index(ckpt, data, lang, key)
+        idx, found = index.resolve(keys)
+        vec = np.ascontiguousarray(snap.vec_e[kg_of(lang)][idx[found]])
+        return {"idx": idx.tolist(), "dtype": str(vec.dtype), "shape": vec.shape,
+                "b64": base64.b64encode(vec.tobytes()).decode("ascii")}
+
+    def table(self, ckpt, data, lang):
+        vec = np.ascontiguousarray(self.models.get(ckpt, data).vec_e[kg_of(lang)])
+        return {"dtype": str(vec.dtype), "shape": vec.shape,
+                "b64": base64.b64encode(vec.tobytes()).decode("ascii")}
+
+    def score(self, ckpt, data, lang, metric, s, o, r=None):
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric!r}")
+        snap = self.models.get(ckpt, data)
+        kg = kg_of(lang)
+        vec = snap.vec_e[kg]
+        norms = snap.derived(("norms", kg), lambda: row_norms(vec))
+        out = score(metric, vec, norms, snap.vec_r.get(kg), snap.L1,
+                    np.asarray(s, dtype=np.int64), np.asarray(o, dtype=np.int64),
+                    None if r is None else np.asarray(r, dtype=np.int64))
+        return {"scores": out.tolist()}
+
+    def knn(self, ckpt, data, src, tgt, keys, k=10, metric="cos", key="label", csls_k=10):
+        snap, index = self._index(ckpt, data, src, key)
+        idx, found = index.resolve(keys)
+        s, nb = neighbours(snap, kg_of(src), kg_of(tgt), idx[found], k, metric, csls_k)
+        src_labels, labels = snap.labels[kg_of(src)], snap.labels[kg_of(tgt)]
+        return {"idx": idx.tolist(),
+                "queries": [src_labels[q] for q in idx[found].tolist()],
+                "neighbours": [[labels[n] for n in row] for row in nb.tolist()],
+                "scores": s.tolist()}
+
+    def health(self):
+        return {"models": [list(k) for k in self.models.loaded]}
+
+
+class Handler(BaseHTTPRequestHandler):
+    engine = None                                      # set by serve()
+    routes = {"/resolve", "/vectors", "/table", "/score", "/knn"}
+
+    def _reply(self, code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, self.engine.health())
+        else:
+            self._reply(404, {"error": f"no route {self.path}"})
+
+    def do_POST(self):
+        if self.path not in self.routes:
+            return self._reply(404, {"error": f"no route {self.path}"})
+        try:
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            self._reply(200, getattr(self.engine, self.path[1:])(**req))
+        except Exception as e:                         # report, keep serving
+            self._reply(400, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=8765, models=(), srcdir="src", capacity=2):
+    Handler.engine = Engine(srcdir, max(capacity, len(models)))
+    for ckpt, data in models:
+        Handler.engine.models.get(ckpt, data)
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    print(f"🛰️  embedding server on http://{host}:{port} ({len(models)} checkpoint(s) preloaded)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+# ── client side ------------------------------------------------------------------
+class EmbeddingClient:
+    """Same calls as `Engine`, over HTTP; numpy arrays in, numpy arrays out."""
+
+    def __init__(self, url=DEFAULT_URL, timeout=600):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, route, body=None, timeout=None):
+        data = None if body is None else json.dumps(body).encode()
+        req = Request(self.url + route, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urlopen(req, timeout=timeout or self.timeout) as resp:
+                return json.loads(resp.read())
+        except URLError as e:
+            body = getattr(e, "read", lambda: b"")()
+            raise RuntimeError(f"embedding server {route}: {body.decode() or e}") from None
+
+    def health(self, timeout=None):
+        return self._call("/health", timeout=timeout)
+
+    def resolve(self, ckpt, data, lang, keys, key="label", kind="entity"):
+        r = self._call("/resolve", dict(ckpt=ckpt, data=data, lang=lang, keys=list(keys), key=key, kind=kind))
+        idx = np.asarray(r["idx"], dtype=np.int64)
+        return idx, idx >= 0
+
+    def vectors(self, ckpt, data, lang, keys, key="label"):
+        r = self._call("/vectors", dict(ckpt=ckpt, data=data, lang=lang, keys=list(keys), key=key))
+        return _array(r), np.asarray(r["idx"]) >= 0
+
+    def table(self, ckpt, data, lang):
+        return _array(self._call("/table", dict(ckpt=ckpt, data=data, lang=lang)))
+
+    def score(self, ckpt, data, lang, metric, s, o, r=None):
+        body = dict(ckpt=ckpt, data=data, lang=lang, metric=metric,
+                    s=np.asarray(s).tolist(), o=np.asarray(o).tolist(),
+                    r=None if r is None else np.asarray(r).tolist())
+        return np.asarray(self._call("/score", body)["scores"], dtype=np.float64)
+
+    def knn(self, ckpt, data, src, tgt, keys, k=10, metric="cos", key="label", csls_k=10):
+        r = self._call("/knn", dict(ckpt=ckpt, data=data, src=src, tgt=tgt, keys=list(keys),
+                                    k=k, metric=metric, key=key, csls_k=csls_k))
+        return r["queries"], r["neighbours"], np.asarray(r["scores"]), np.asarray(r["idx"]) >= 0
+
+
+def _array(r):
+    return np.frombuffer(base64.b64decode(r["b64"]), dtype=r["dtype"]).reshape(r["shape"])
+
+
+class RemoteIndex:
+    """`LabelIndex` / `QidIndex` interface over one KG of a server-side checkpoint."""
+
+    def __init__(self, client, ckpt, data, lang, key="label"):
+        self.client, self.ckpt, self.data, self.lang, self.key = client, ckpt, data, lang, key
+
+    def resolve(self, column):
+        return self.client.resolve(self.ckpt, self.data, self.lang, list(column), self.key)
+
+    def gather(self, vec, column):
+        idx, found = self.resolve(column)
+        return vec[idx[found]], found
+
+
+def connect(url=None, timeout=0.5):
+    """EmbeddingClient if a server answers at `url` / $EMB_SERVER, else None."""
+    if url == "off":
+        return None
+    client = EmbeddingClient(url or os.environ.get("EMB_SERVER", DEFAULT_URL))
+    try:
+        client.health(timeout=timeout)
+    except (RuntimeError, OSError):
+        return None
+    print(f"🛰️  using embedding server at {client.url}")
+    return client
+
+
+# ── main ---------------------------------------------------------------------
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--model", action="append", default=[], metavar="CKPT:DATA",
+                   help="checkpoint to preload (repeatable)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--srcdir", default="src")
+    p.add_argument("--capacity", type=int, default=2, help="checkpoints kept resident")
+    a = p.parse_args(argv)
+    serve(a.host, a.port, [tuple(m.split(":", 1)) for m in a.model], a.srcdir, a.capacity)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+entity_ids.py
+──────────────────────────────────────────────────────
+Q-id helpers for the ID-keyed pipeline.
+
+`convert_for_mTransE_csv.py --ids` writes KGs whose entities are Wikidata
+Q-ids (`Q42@@@P31@@@Q5`) instead of labels, plus side tables with the
+label/description of every id. The same entity therefore has the same key
+in every language, and downstream lookups are exact integer joins instead
+of regex-canonicalised label matches.
+
+Side tables are plain TSV:
+    <prefix>_entities.tsv   id  label  description
+    <prefix>_relations.tsv  id  label
+"""
+
+import csv
+from pathlib import Path
+
+import numpy as np
+
+
+P_OFFSET = 1 << 40      # P-ids live above every Q-id, so 'Q31' and 'P31' never collide
+
+
+def qid_to_int(qid: str) -> int:
+    """'Q42' / 'P31' → 42 / P_OFFSET + 31 (one integer space for both namespaces)."""
+    n = int(qid[1:])
+    return n + P_OFFSET if qid[0] == "P" else n
+
+
+def int_to_qid(n: int) -> str:
+    """Inverse of `qid_to_int`."""
+    return f"P{n - P_OFFSET}" if n >= P_OFFSET else f"Q{n}"
+
+
+def looks_like_qid(key: str) -> bool:
+    return len(key) > 1 and key[0] in "QP" and key[1:].isdigit()
+
+
+# ── side tables --------------------------------------------------------------
+def write_side_table(path: Path, rows: dict, with_desc=True):
+    """rows: id → (label, description)"""
+    with Path(path).open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter="\t", quoting=csv.QUOTE_NONE,
+                       escapechar="\\", lineterminator="\n")
+        w.writerow(["id", "label", "description"] if with_desc else ["id", "label"])
+        for key, (label, desc) in rows.items():
+            w.writerow([key, label, desc or ""] if with_desc else [key, label])
+
+
+def read_side_table(path: Path) -> dict:
+    """id → (label, description or None)"""
+    out = {}
+    with Path(path).open(encoding="utf-8") as f:
+        rdr = csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar="\\")
+        next(rdr, None)                                   # header
+        for row in rdr:
+            out[row[0]] = (row[1], row[2] or None if len(row) > 2 else None)
+    return out
+
+
+# ── Q-id lookup ---------------------------------------------------------------
+class QidIndex:
+    """int(Q-id) → row of a `vec_e` table, for checkpoints trained on Q-id KGs.
+
+    Same interface as `label_lookup.LabelIndex`: `resolve` is a sorted-array
+    join (`np.searchsorted`), -1 / mask False where the id is unknown.
+    """
+
+    def __init__(self, keys):
+        ids = np.fromiter((qid_to_int(k) if k and looks_like_qid(k) else -1 for k in keys),
+                          dtype=np.int64)
+        rows = np.flatnonzero(ids >= 0)
+        order = np.argsort(ids[rows], kind="stable")
+        self.ids, self.rows = ids[rows][order], rows[order]
+
+    def resolve(self, column):
+        q = np.fromiter((qid_to_int(k) if looks_like_qid(k) else -1 for k in column),
+                        dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(q), -1, dtype=np.int64), np.zeros(len(q), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.ids, q), len(self.ids) - 1)
+        found = self.ids[pos] == q
+        return np.where(found, self.rows[pos], -1), found
+
+    def gather(self, vec, column):
+        idx, found = self.resolve(column)
+        return vec[idx[found]], found
+
+
+def triple_keys(row: list, key: str = "label"):
+    """(subject, object) key of a labels/descriptions/3-column triple row;
+    ("", "") for a blank or short row, which then resolves as missing."""
+    if len(row) >= 6:
+        return (row[0], row[4]) if key == "qid" else (row[1], row[5])
+    if len(row) < 3:
+        return "", ""
+    return row[0], row[2]
+
+
+def relation_key(row: list, key: str = "label"):
+    """relation key of a labels/descriptions/3-column triple row ("" if short)."""
+    if len(row) >= 6:
+        return row[2] if key == "qid" else row[3]
+    return row[1] if len(row) >= 3 else ""
@@ -0,0 +1,170 @@
+"""
+entity_store.py
+──────────────────────────────────────────────────────
+Deduplicated subject/object embedding format.
+
+The legacy extraction output stores one vector per triple row
+(`subject_embeddings_<p>.npy`, `object_embeddings_<p>.npy` + label .txt), so a
+popular entity is copied thousands of times. The dedup format stores every
+entity once and the triples as compact int32 index arrays:
+
+    entity_embeddings_<p>.npy   [U, d]  unique entity vectors
+    entity_labels_<p>.txt       U lines, one label per unique entity
+    subject_index_<p>.npy       [rows]  int32 row into the matrix, -1 = no embedding
+    object_index_<p>.npy        [rows]  int32, same convention
+    row_labels_<p>.txt          distinct label strings of the triple rows
+    subject_label_index_<p>.npy [rows]  int32 line of row_labels, -1 = no embedding
+    object_label_index_<p>.npy  [rows]  int32, same convention
+
+One entity can be spelled differently across rows (casing, quoting in the
+TSV), so the per-row labels are kept separately from the entity table:
+`load_role` returns exactly the labels the rows format would. Files written
+before the label index existed fall back to the entity table's labels.
+
+`load_role(<dir>, "subject", <p>)` reads either format and returns
+(vectors, labels). For the dedup format both are lazy views that expand to
+the legacy per-row layout only on access (`np.asarray(view)`, slicing,
+indexing), so existing consumers keep working unchanged.
+
+`unique_rows` collapses per-row vectors of either format back to the
+distinct vectors plus one inverse index per input, so projections (t-SNE)
+run on each entity once and are scattered back with `coords[inverse]`.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+
+def save_dedup(out_prefix, vec, subj_idx, obj_idx, subj_labels, obj_labels, out_dir="."):
+    """Write the dedup format.
+
+    vec: full `vec_e` table; subj_idx / obj_idx: per-row entity indices into
+    `vec` (-1 where missing); *_labels: per-row label strings.
+    Returns (#unique entities, #rows).
+    """
+    out_dir = Path(out_dir)
+    both = np.concatenate([subj_idx, obj_idx])
+    found = both >= 0
+    uniq, first, inv = np.unique(both[found], return_index=True, return_inverse=True)
+
+    rows = np.full(len(both), -1, dtype=np.int32)
+    rows[found] = inv.reshape(-1)
+    all_labels = list(subj_labels) + list(obj_labels)
+    pos = np.flatnonzero(found)[first]                   # first row naming each entity
+    codes = {}                                           # row label → line of row_labels
+    label_rows = np.full(len(both), -1, dtype=np.int32)
+    label_rows[found] = np.fromiter((codes.setdefault(all_labels[p], len(codes))
+                                     for p in np.flatnonzero(found).tolist()),
+                                    dtype=np.int32, count=int(found.sum()))
+
+    np.save(out_dir / f"entity_embeddings_{out_prefix}.npy", vec[uniq])
+    np.save(out_dir / f"subject_index_{out_prefix}.npy", rows[:len(subj_idx)])
+    np.save(out_dir / f"object_index_{out_prefix}.npy", rows[len(subj_idx):])
+    with open(out_dir / f"entity_labels_{out_prefix}.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(all_labels[p] for p in pos))
+    strings_p, subj_lp = row_label_paths(out_dir, "subject", out_prefix)
+    np.save(subj_lp, label_rows[:len(subj_idx)])
+    np.save(row_label_paths(out_dir, "object", out_prefix)[1], label_rows[len(subj_idx):])
+    with open(strings_p, "w", encoding="utf-8") as f:
+        f.write("\n".join(codes))
+    return len(uniq), len(subj_idx)
+
+
+def write_rows_npy(path, vec, idx, chunk=65536):
+    """Gather vec[idx] into a memory-mapped .npy, `chunk` rows at a time."""
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=vec.dtype,
+                                    shape=(len(idx),) + vec.shape[1:])
+    for i in range(0, len(idx), chunk):
+        np.take(vec, idx[i:i + chunk], axis=0, out=out[i:i + chunk])
+    out.flush()
+    del out
+    return len(idx)
+
+
+class RowView:
+    """Per-row view over a unique-entity table; rows are gathered on access."""
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index[index >= 0]                   # legacy files only hold found rows
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def shape(self):
+        return (len(self.index),) + tuple(np.shape(self.table)[1:])
+
+    def __getitem__(self, key):
+        if isinstance(self.table, np.ndarray):
+            return self.table[self.index[key]]
+        idx = self.index[key]
+        return self.table[idx] if np.ndim(idx) == 0 else [self.table[i] for i in idx]
+
+    def __iter__(self):
+        for i in self.index:
+            yield self.table[i]
+
+    def __array__(self, dtype=None, copy=None):
+        out = np.asarray(self.table)[self.index]
+        return out if dtype is None else out.astype(dtype)
+
+
+def dedup_paths(emb_dir, role, prefix):
+    emb_dir = Path(emb_dir)
+    return (emb_dir / f"entity_embeddings_{prefix}.npy",
+            emb_dir / f"entity_labels_{prefix}.txt",
+            emb_dir / f"{role}_index_{prefix}.npy")
+
+
+def row_label_paths(emb_dir, role, prefix):
+    emb_dir = Path(emb_dir)
+    return emb_dir / f"row_labels_{prefix}.txt", emb_dir / f"{role}_label_index_{prefix}.npy"
+
+
+def load_dedup(emb_dir, prefix):
+    """(unique matrix [memory-mapped], unique labels, subject index, object index)"""
+    mat_p, lbl_p, subj_p = dedup_paths(emb_dir, "subject", prefix)
+    with open(lbl_p, encoding="utf-8") as f:
+        labels = f.read().split("\n")
+    return (np.load(mat_p, mmap_mode="r"), labels,
+            np.load(subj_p), np.load(dedup_paths(emb_dir, "object", prefix)[2]))
+
+
+def load_role(emb_dir, role, prefix):
+    """(vectors, labels) of one role ("subject" / "object") in either format."""
+    mat_p, lbl_p, idx_p = dedup_paths(emb_dir, role, prefix)
+    if mat_p.exists() and idx_p.exists():
+        with open(lbl_p, encoding="utf-8") as f:
+            labels = f.read().split("\n")
+        index = np.load(idx_p)
+        strings_p, lidx_p = row_label_paths(emb_dir, role, prefix)
+        if lidx_p.exists():                              # per-row spellings, as in the rows format
+            with open(strings_p, encoding="utf-8") as f:
+                strings = [line.strip() for line in f.read().split("\n")]
+            return RowView(np.load(mat_p, mmap_mode="r"), index), RowView(strings, np.load(lidx_p))
+        return RowView(np.load(mat_p, mmap_mode="r"), index), RowView(labels, index)
+
+    emb_dir = Path(emb_dir)
+    with open(emb_dir / f"{role}_labels_{prefix}.txt", encoding="utf-8") as f:
+        labels = [line.strip() for line in f]
+    return np.load(emb_dir / f"{role}_embeddings_{prefix}.npy"), labels
+
+
+def row_keys(x):
+    """One opaque, sortable key per row of a 2-D array (its raw bytes)."""
+    x = np.ascontiguousarray(x)
+    return x.view(np.dtype((np.void, x.dtype.itemsize * x.shape[1]))).ravel()
+
+
+def unique_rows(*parts):
+    """Distinct vectors over all parts → (unique [U, d], [inverse index per part]).
+
+    Rows are compared bit for bit, so `unique[inverse]` reproduces every part
+    exactly.
+    """
+    stacked = np.ascontiguousarray(np.concatenate([np.asarray(p) for p in parts]))
+    _, first, inverse = np.unique(row_keys(stacked), return_index=True, return_inverse=True)
+    bounds = np.cumsum([0] + [len(p) for p in parts])
+    return stacked[first], [inverse[a:b].ravel() for a, b in zip(bounds[:-1], bounds[1:])]
@@ -0,0 +1,117 @@
+"""
+eval_alignment.py
+──────────────────────────────────────────────────────
+Cross-lingual alignment quality of a checkpoint: Hits@1/5/10 and MRR of the
+gold target among *all* target entities, for every pair of a gold file
+(TSV of source / target labels, or Q-ids with --key qid), optionally after a
+`linear_map.py` map.
+
+The rank of each gold target is 1 + the number of targets scoring higher,
+counted tile by tile over (query block × target block) matmuls on a thread
+pool — the N×M similarity matrix never exists. --metric csls subtracts the
+target hubness term r_T(y); the query term does not change a row's ranking.
+
+Results are written as JSON so runs can be compared automatically:
+
+python eval_alignment.py --ckpt test-model-m2-no-alignment-wk5m60k-en-de.ckpt \
+                         --data test-multiG-m2-no-alignment-wk5m60k-en-de.bin \
+                         --src en --tgt de --gold gold_en_de.tsv [--map map_en_de.npz] \
+                         --out eval_en_de.json
+"""
+
+import argparse, json, os, time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from checkpoint_cache import ModelCache, kg_of
+from knn import normalize, topk, unit_table
+from linear_map import apply_map, load_map, read_pairs, resolve_pairs
+
+HITS = (1, 5, 10)
+
+
+def _ranks_block(q, gold, gold_s, x, penalty, x_block):
+    above = np.zeros(len(q), dtype=np.int64)
+    buf = np.empty((len(q), min(x_block, len(x))), dtype=np.float32)
+    for j in range(0, len(x), x_block):
+        xb = x[j:j + x_block]
+        s = np.matmul(q, xb.T, out=buf[:, :len(xb)])
+        if penalty is not None:
+            s -= penalty[j:j + x_block]
+        above += np.count_nonzero(s > gold_s[:, None], axis=1)
+        # the gold column itself may round a hair above gold_s; never count it
+        r = np.flatnonzero((gold >= j) & (gold < j + len(xb)))
+        above[r] -= s[r, gold[r] - j] > gold_s[r]
+    return above + 1
+
+
+def gold_ranks(q, x, gold, penalty=None, q_block=1024, x_block=8192, workers=None):
+    """1-based rank of x[gold[i]] among all rows of x for query q[i] (ties count in favour)."""
+    gold = np.asarray(gold)
+    gold_s = np.einsum("ij,ij->i", q, x[gold])
+    if penalty is not None:
+        gold_s = gold_s - penalty[gold]
+    starts = range(0, len(q), q_block)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        parts = pool.map(lambda s: _ranks_block(q[s:s + q_block], gold[s:s + q_block], gold_s[s:s + q_block],
+                                                x, penalty, x_block), starts)
+        return np.concatenate(list(parts) or [np.zeros(0, np.int64)])
+
+
+def summarize(ranks):
+    out = {f"hits@{k}": float(np.mean(ranks <= k)) if len(ranks) else 0.0 for k in HITS}
+    out["mrr"] = float(np.mean(1.0 / ranks)) if len(ranks) else 0.0
+    return out
+
+
+def evaluate(snap, src_kg, tgt_kg, s_idx, t_idx, W=None, metric="cos", csls_k=10, normed=True, **kw):
+    """Hits@k / MRR dict for gold rows (s_idx → t_idx). normed: the map was fit on
+    unit source vectors (the map's "normed" metadata)."""
+    tgt = unit_table(snap, tgt_kg)
+    src = unit_table(snap, src_kg) if W is None else normalize(apply_map(snap.vec_e[src_kg], W, normed=normed))
+    penalty = None
+    if metric == "csls":
+        penalty = topk(tgt, src, csls_k, **kw)[0].mean(axis=1)
+    return summarize(gold_ranks(src[s_idx], tgt, t_idx, penalty, **kw))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--ckpt", required=True)
+    p.add_argument("--data", required=True)
+    p.add_argument("--src", required=True, choices=["en", "de", "ru"])
+    p.add_argument("--tgt", required=True, choices=["en", "de", "ru"])
+    p.add_argument("--gold", required=True, help="TSV of gold (source, target) key pairs")
+    p.add_argument("--key", default="label", choices=["label", "qid"])
+    p.add_argument("--map", help="linear_map.py map applied to the source side")
+    p.add_argument("--metric", default="cos", choices=["cos", "csls"])
+    p.add_argument("--csls-k", type=int, default=10)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--srcdir", default="src")
+    p.add_argument("--out", required=True, help="JSON results file")
+    a = p.parse_args(argv)
+
+    t0 = time.perf_counter()
+    snap = ModelCache(a.srcdir).get(a.ckpt, a.data)
+    src_kg, tgt_kg = kg_of(a.src), kg_of(a.tgt)
+    s_idx, t_idx, skipped = resolve_pairs(snap, src_kg, tgt_kg, read_pairs(a.gold), a.key)
+    W, meta = load_map(a.map) if a.map else (None, {})
+    if meta and (meta.get("src"), meta.get("tgt")) != (a.src, a.tgt):
+        raise SystemExit(f"❌ {a.map} maps {meta.get('src')}→{meta.get('tgt')}, not {a.src}→{a.tgt}")
+
+    t1 = time.perf_counter()
+    result = evaluate(snap, src_kg, tgt_kg, s_idx, t_idx, W, a.metric, a.csls_k,
+                      bool(meta.get("normed", True)), workers=a.workers)
+    result.update(ckpt=a.ckpt, data=a.data, src=a.src, tgt=a.tgt, gold=a.gold, map=a.map,
+                  metric=a.metric, pairs=int(len(s_idx)), unresolved=skipped,
+                  targets=int(len(snap.vec_e[tgt_kg])), eval_seconds=round(time.perf_counter() - t1, 3),
+                  total_seconds=round(time.perf_counter() - t0, 3))
+    with open(a.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(" ".join(f"{k}={result[k]:.4f}" for k in [f"hits@{k}" for k in HITS] + ["mrr"]),
+          f"({len(s_idx)} pairs, {skipped} unresolved) → {a.out}")
+
+
+if __name__ == "__main__":
+    main()
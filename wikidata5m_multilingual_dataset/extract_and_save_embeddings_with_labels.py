@@ -2,81 +2,118 @@
 """
 Extract and save subject and object embeddings with their corresponding labels
 for English, German, and Russian from language-specific triple files.
-"""
 
-import csv, sys, importlib.util, re
-from pathlib import Path
-import numpy as np
+fmt="rows"  → one vector per triple row (subject/object_embeddings_<p>.npy + labels)
+fmt="dedup" → unique entity matrix + int32 subject/object index arrays
+              (see entity_store.py; `load_role` reads both formats)
 
-# ── Canonicalize label (normalize for matching) ──
-_quote_re = re.compile(r"[\"“”„‟‶‷❝❞«»‹›]")
-_ws_re = re.compile(r"\s+")
-def canon(label: str) -> str:
-    s = _quote_re.sub("", label)
-    s = _ws_re.sub(" ", s).strip().lower()
-    return s
-
-# ── Dynamic module loader ──
-def load_module(py_path: Path, name: str):
-    spec = importlib.util.spec_from_file_location(name, str(py_path))
-    m = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(m)
-    sys.modules[name] = m
-    return m
-
-# ── Main extraction function ──
-def extract_embeddings(lang, ckpt, data, triples, out_prefix, srcdir="src"):
-    SRC = Path(srcdir)
-    load_module(SRC / "KG.py", "KG")
-    load_module(SRC / "multiG.py", "multiG")
-    load_module(SRC / "model2.py", "model2")
-    load_module(SRC / "trainer2.py", "trainer2")
-    Tester = load_module(SRC / "tester_MTransE2.py", "tester_MTransE2").Tester
+stream=True (rows format) reads the triple file in chunks, writes the label
+files incrementally and gathers vectors straight into memory-mapped .npy
+outputs, so peak memory no longer scales with the number of vectors.
 
-    tester = Tester()
-    tester.build(save_path=ckpt, data_save_path=data)
+When embedding_server.py answers (--server / $EMB_SERVER), each language's
+`vec_e` table is fetched from it once (/table) and labels are resolved
+remotely, so no checkpoint is loaded in-process.
 
-    vec = tester.vec_e[1] if lang == "en" else tester.vec_e[2]
+python extract_and_save_embeddings_with_labels.py [--fmt dedup] [--stream] [--server URL]
+"""
 
-    id2idx = {}
-    for i in range(len(vec)):
-        lbl = tester.ent_index2str(i, 1 if lang == "en" else 2)
-        id2idx[lbl] = id2idx[canon(lbl)] = i
+import argparse, os, sys
+from pathlib import Path
+import numpy as np
 
-    def vec_by_label(lbl):
-        c = canon(lbl)
-        idx = id2idx.get(lbl) or id2idx.get(c)
-        return None if idx is None else vec[idx]
+sys.path.append(os.path.join(os.path.dirname(__file__), "../wikidata5m_multilingual_dataset"))
+from checkpoint_cache import ModelCache, kg_of, run_parallel
+from embedding_server import RemoteIndex, connect
+from entity_ids import triple_keys
+from entity_store import save_dedup, write_rows_npy
+from label_lookup import entity_index
+from triple_io import iter_chunks, triple_reader
+
+# ── Shared checkpoint cache: each (ckpt, data) pair is loaded once ──
+_cache = None
+
+def default_cache(srcdir="src"):
+    global _cache
+    if _cache is None or _cache.srcdir != srcdir:
+        _cache = ModelCache(srcdir=srcdir)
+    return _cache
+
+# ── Streaming extraction (bounded memory) ──
+def _stream_rows(rdr, index, vec, key, out_prefix, chunk):
+    """Resolve chunk by chunk, writing labels as we go and keeping only int32
+    row indices; vectors are then gathered straight into memory-mapped .npy."""
+    subj_idx, obj_idx = [], []
+    with open(f"subject_labels_{out_prefix}.txt", "w", encoding="utf-8") as fs, \
+         open(f"object_labels_{out_prefix}.txt", "w", encoding="utf-8") as fo:
+        n_s = n_o = 0
+        for rows in iter_chunks(rdr, chunk):
+            keys = [triple_keys(row, key) for row in rows]
+            si, sf = index.resolve(k[0] for k in keys)
+            oi, of = index.resolve(k[1] for k in keys)
+            for row, s_ok, o_ok in zip(rows, sf, of):
+                if s_ok:     # same "\n".join layout as the in-memory path
+                    fs.write(("\n" if n_s else "") + (row[1] if len(row) >= 6 else row[0]))
+                    n_s += 1
+                if o_ok:
+                    fo.write(("\n" if n_o else "") + (row[5] if len(row) >= 6 else row[2]))
+                    n_o += 1
+            subj_idx.append(si[sf].astype(np.int32))
+            obj_idx.append(oi[of].astype(np.int32))
+
+    n_subj = write_rows_npy(f"subject_embeddings_{out_prefix}.npy", vec,
+                            np.concatenate(subj_idx) if subj_idx else np.zeros(0, np.int32), chunk)
+    n_obj = write_rows_npy(f"object_embeddings_{out_prefix}.npy", vec,
+                           np.concatenate(obj_idx) if obj_idx else np.zeros(0, np.int32), chunk)
+    return n_subj, n_obj
 
-    subj_vecs, obj_vecs = [], []
-    subj_labels, obj_labels = [], []
+# ── Main extraction function ──
+def extract_embeddings(lang, ckpt, data, triples, out_prefix, srcdir="src", key="label", cache=None,
+                       fmt="rows", stream=False, chunk=65536, client=None):
+    if client is not None:                 # resident server: one table fetch, remote lookups
+        vec = client.table(ckpt, data, lang)
+        index = RemoteIndex(client, ckpt, data, lang, key)
+    else:
+        snap = (cache or default_cache(srcdir)).get(ckpt, data)
+        kg = kg_of(lang)
+        vec = snap.vec_e[kg]
+        index = entity_index(snap, kg, key)    # LabelIndex, or QidIndex for Q-id checkpoints
 
     with Path(triples).open(encoding="utf-8") as fin:
-        rdr = csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE)
-        first_row = next(rdr)
-        if first_row[:2] == ["subject_id", "subject_label"]:
+        rdr, skipped = triple_reader(fin)
+        if skipped:
             print(f"⚙️  Skipped header row for {lang}")
-        else:
-            fin.seek(0)
-            rdr = csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE)
 
+        if stream and fmt == "rows":
+            n_subj, n_obj = _stream_rows(rdr, index, vec, key, out_prefix, chunk)
+            print(f"✅ {lang.upper()}: streamed {n_subj} subject / {n_obj} object vectors "
+                  f"→ subject/object_embeddings_{out_prefix}.npy (+ labels)")
+            return
+
+        subj_keys, obj_keys, subj_labels, obj_labels = [], [], [], []
         for row in rdr:
-            subj_label = row[1] if len(row) >= 6 else row[0]
-            obj_label  = row[5] if len(row) >= 6 else row[2]
+            subj_key, obj_key = triple_keys(row, key)
+            subj_keys.append(subj_key)
+            obj_keys.append(obj_key)
+            subj_labels.append(row[1] if len(row) >= 6 else row[0])
+            obj_labels.append(row[5] if len(row) >= 6 else row[2])
 
-            vs = vec_by_label(subj_label)
-            vo = vec_by_label(obj_label)
+    subj_idx, subj_found = index.resolve(subj_keys)
+    obj_idx, obj_found = index.resolve(obj_keys)
 
-            if vs is not None:
-                subj_vecs.append(vs)
-                subj_labels.append(subj_label)
+    if fmt == "dedup":
+        n_uniq, n_rows = save_dedup(out_prefix, vec, subj_idx, obj_idx, subj_labels, obj_labels)
+        print(f"✅ {lang.upper()}: saved {n_uniq} unique entity vectors for {n_rows} triples "
+              f"→ entity_embeddings_{out_prefix}.npy + subject/object_index_{out_prefix}.npy")
+        return
 
-            if vo is not None:
-                obj_vecs.append(vo)
-                obj_labels.append(obj_label)
+    # one fancy-index per column
+    subj_vecs, obj_vecs = vec[subj_idx[subj_found]], vec[obj_idx[obj_found]]
+    subj_labels = [l for l, f in zip(subj_labels, subj_found) if f]
+    obj_labels = [l for l, f in zip(obj_labels, obj_found) if f]
 
-    np.save(f"subject_embeddings_{out_prefix}.npy", np.stack(subj_vecs))
-    np.save(f"object_embeddings_{out_prefix}.npy", np.stack(obj_vecs))
+    np.save(f"subject_embeddings_{out_prefix}.npy", subj_vecs)
+    np.save(f"object_embeddings_{out_prefix}.npy", obj_vecs)
 
     with open(f"subject_labels_{out_prefix}.txt", "w", encoding="utf-8") as f:
         f.write("\n".join(subj_labels))
@@ -89,38 +126,48 @@ def extract_embeddings(lang, ckpt, data, triples, out_prefix, srcdir="src"):
     print(f"📝 {lang.upper()}: saved object labels → object_labels_{out_prefix}.txt")
 
 # ── Entry Point ──
-def main():
-    extract_embeddings(
-        lang="en",
-        ckpt="test-model-m2-no-alignment-wk5m60k-en-de.ckpt",
-        data="test-multiG-m2-no-alignment-wk5m60k-en-de.bin",
-        triples="wikidata5m_top200_en_60k_labels.tsv",
-        out_prefix="en"
-    )
-
-    extract_embeddings(
-        lang="de",
-        ckpt="test-model-m2-no-alignment-wk5m60k-en-de.ckpt",
-        data="test-multiG-m2-no-alignment-wk5m60k-en-de.bin",
-        triples="wikidata5m_top200_de_60k_labels.tsv",
-        out_prefix="de"
-    )
-
-    extract_embeddings(
-        lang="ru",
-        ckpt="test-model-m2-no-alignment-wk5m60k-en-ru.ckpt",
-        data="test-multiG-m2-no-alignment-wk5m60k-en-ru.bin",
-        triples="wikidata5m_top200_ru_60k_labels.tsv",
-        out_prefix="ru"
-    )
-
-    extract_embeddings(
-        lang="en",
-        ckpt="test-model-m2-no-alignment-wk5m60k-en-ru.ckpt",
-        data="test-multiG-m2-no-alignment-wk5m60k-en-ru.bin",
-        triples="wikidata5m_top200_en_60k_labels.tsv",
-        out_prefix="en2"
-    )
+# The en-de and en-ru checkpoints are each loaded once and shared by both of
+# their languages; the four extractions then run in parallel.
+JOBS = [
+    dict(lang="en",
+         ckpt="test-model-m2-no-alignment-wk5m60k-en-de.ckpt",
+         data="test-multiG-m2-no-alignment-wk5m60k-en-de.bin",
+         triples="wikidata5m_top200_en_60k_labels.tsv",
+         out_prefix="en"),
+    dict(lang="de",
+         ckpt="test-model-m2-no-alignment-wk5m60k-en-de.ckpt",
+         data="test-multiG-m2-no-alignment-wk5m60k-en-de.bin",
+         triples="wikidata5m_top200_de_60k_labels.tsv",
+         out_prefix="de"),
+    dict(lang="ru",
+         ckpt="test-model-m2-no-alignment-wk5m60k-en-ru.ckpt",
+         data="test-multiG-m2-no-alignment-wk5m60k-en-ru.bin",
+         triples="wikidata5m_top200_ru_60k_labels.tsv",
+         out_prefix="ru"),
+    dict(lang="en",
+         ckpt="test-model-m2-no-alignment-wk5m60k-en-ru.ckpt",
+         data="test-multiG-m2-no-alignment-wk5m60k-en-ru.bin",
+         triples="wikidata5m_top200_en_60k_labels.tsv",
+         out_prefix="en2"),
+]
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--srcdir", default="src")
+    p.add_argument("--fmt", default="rows", choices=["rows", "dedup"])
+    p.add_argument("--stream", action="store_true", help="bounded-memory, memory-mapped output")
+    p.add_argument("--chunk", type=int, default=65536)
+    p.add_argument("--server", default=None,
+                   help="embedding_server.py URL to fetch the tables from ('off': always in-process)")
+    a = p.parse_args(argv)
+
+    client, cache = connect(a.server), None
+    if client is None:
+        cache = ModelCache(srcdir=a.srcdir, capacity=2)
+        for job in JOBS:                 # load each checkpoint once, up front
+            cache.get(job["ckpt"], job["data"])
+    run_parallel(extract_embeddings, [dict(job, cache=cache, client=client, fmt=a.fmt, stream=a.stream,
+                                           chunk=a.chunk) for job in JOBS])
 
 if __name__ == "__main__":
     main()
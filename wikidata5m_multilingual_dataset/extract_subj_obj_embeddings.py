@@ -2,118 +2,129 @@
 Extract and save subject and object embeddings for English and German
 based on their textual labels from language-specific triple files.
 
+stream=True reads the triple file in chunks and gathers the vectors straight
+into memory-mapped .npy outputs (peak memory: int32 row indices + one chunk).
+
+When embedding_server.py answers (--server / $EMB_SERVER), each language's
+`vec_e` table is fetched from it once (/table) and labels are resolved
+remotely, so no checkpoint is loaded in-process.
+
+python extract_subj_obj_embeddings.py [--stream] [--server URL]
 """
 
 
-import argparse, csv, sys, importlib.util, re
+import argparse, os, sys
 from pathlib import Path
 import numpy as np
 
-# ── Canonicalize label (normalize for matching) ──
-_quote_re = re.compile(r"[\"“”„‟‶‷❝❞«»‹›]")
-_ws_re = re.compile(r"\s+")
-def canon(label: str) -> str:
-    s = _quote_re.sub("", label)
-    s = _ws_re.sub(" ", s).strip().lower()
-    return s
-
-# ── Dynamic module loader from repo ──
-def load_module(py_path: Path, name: str):
-    spec = importlib.util.spec_from_file_location(name, str(py_path))
-    m = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(m)
-    sys.modules[name] = m
-    return m
-
-# ── Core extraction logic ──
-def extract_embeddings(lang, ckpt, data, triples, out_subject, out_object, srcdir="src"):
-    SRC = Path(srcdir)
-    load_module(SRC / "KG.py", "KG")
-    load_module(SRC / "multiG.py", "multiG")
-    load_module(SRC / "model2.py", "model2")
-    load_module(SRC / "trainer2.py", "trainer2")
-    Tester = load_module(SRC / "tester_MTransE2.py", "tester_MTransE2").Tester
-
-    tester = Tester()
-    tester.build(save_path=ckpt, data_save_path=data)
+sys.path.append(os.path.join(os.path.dirname(__file__), "../wikidata5m_multilingual_dataset"))
+from checkpoint_cache import ModelCache, kg_of, run_parallel
+from embedding_server import RemoteIndex, connect
+from entity_ids import triple_keys
+from entity_store import write_rows_npy
+from label_lookup import entity_index
+from triple_io import iter_chunks, triple_reader
 
-    vec = tester.vec_e[1] if lang == "en" else tester.vec_e[2]
+# ── Shared checkpoint cache: each (ckpt, data) pair is loaded once ──
+_cache = None
 
-    id2idx = {}
-    for i in range(len(vec)):
-        lbl = tester.ent_index2str(i, 1 if lang == "en" else 2)
-        id2idx[lbl] = id2idx[canon(lbl)] = i
+def default_cache(srcdir="src"):
+    global _cache
+    if _cache is None or _cache.srcdir != srcdir:
+        _cache = ModelCache(srcdir=srcdir)
+    return _cache
 
-    def vec_by_label(lbl):
-        c = canon(lbl)
-        idx = id2idx.get(lbl) or id2idx.get(c)
-        return None if idx is None else vec[idx]
-
-    subjects, objects = [], []
+# ── Core extraction logic ──
+def extract_embeddings(lang, ckpt, data, triples, out_subject, out_object, srcdir="src", key="label",
+                       cache=None, stream=False, chunk=65536, client=None):
+    if client is not None:                 # resident server: one table fetch, remote lookups
+        vec = client.table(ckpt, data, lang)
+        index = RemoteIndex(client, ckpt, data, lang, key)
+    else:
+        snap = (cache or default_cache(srcdir)).get(ckpt, data)
+        kg = kg_of(lang)
+        vec = snap.vec_e[kg]
+        index = entity_index(snap, kg, key)    # LabelIndex, or QidIndex for Q-id checkpoints
 
     with Path(triples).open(encoding="utf-8") as fin:
-        rdr = csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE)
-        first_row = next(rdr)
-        if first_row[:2] == ["subject_id", "subject_label"]:
+        rdr, skipped = triple_reader(fin)
+        if skipped:
             print(f"⚙️  Detected and skipped header row for {lang}")
-        else:
-            fin.seek(0)
-            rdr = csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE)
-
-        for row in rdr:
-            subj_label = row[1] if len(row) >= 6 else row[0]
-            obj_label  = row[5] if len(row) >= 6 else row[2]
-
-            vs = vec_by_label(subj_label)
-            vo = vec_by_label(obj_label)
-
-            if vs is not None:
-                subjects.append(vs)
-            if vo is not None:
-                objects.append(vo)
-
-        np.save(out_subject, np.stack(subjects))
-        np.save(out_object, np.stack(objects))
-        print(f"✅ {lang.upper()}: saved {len(subjects)} subject vectors → {out_subject}.npy")
-        print(f"✅ {lang.upper()}: saved {len(objects)} object vectors → {out_object}.npy")
+
+        if stream:
+            subj_idx, obj_idx = [], []
+            for rows in iter_chunks(rdr, chunk):
+                keys = [triple_keys(row, key) for row in rows]
+                si, sf = index.resolve(k[0] for k in keys)
+                oi, of = index.resolve(k[1] for k in keys)
+                subj_idx.append(si[sf].astype(np.int32))
+                obj_idx.append(oi[of].astype(np.int32))
+            empty = np.zeros(0, np.int32)
+            n_subj = write_rows_npy(f"{out_subject}.npy", vec,
+                                    np.concatenate(subj_idx) if subj_idx else empty, chunk)
+            n_obj = write_rows_npy(f"{out_object}.npy", vec,
+                                   np.concatenate(obj_idx) if obj_idx else empty, chunk)
+            print(f"✅ {lang.upper()}: streamed {n_subj} subject vectors → {out_subject}.npy")
+            print(f"✅ {lang.upper()}: streamed {n_obj} object vectors → {out_object}.npy")
+            return
+
+        keys = [triple_keys(row, key) for row in rdr]
+
+    # one resolve + one fancy-index per column
+    subjects, _ = index.gather(vec, [k[0] for k in keys])
+    objects, _ = index.gather(vec, [k[1] for k in keys])
+
+    np.save(out_subject, subjects)
+    np.save(out_object, objects)
+    print(f"✅ {lang.upper()}: saved {len(subjects)} subject vectors → {out_subject}.npy")
+    print(f"✅ {lang.upper()}: saved {len(objects)} object vectors → {out_object}.npy")
+
 # ── Entry Point ──
-def main():
-    extract_embeddings(
-        lang="en",
-        ckpt="test-model-m2-no-alignment-wk5m60k-en-de.ckpt",
-        data="test-multiG-m2-no-alignment-wk5m60k-en-de.bin",
-        triples="wikidata5m_top200_en_42k_descriptions_truncated.tsv",
-        out_subject="subject_embeddings_en",
-        out_object="object_embeddings_en"
-    )
-
-    extract_embeddings(
-        lang="de",
-        ckpt="test-model-m2-no-alignment-wk5m60k-en-de.ckpt",
-        data="test-multiG-m2-no-alignment-wk5m60k-en-de.bin",
-        triples="wikidata5m_top200_de_42k_descriptions_truncated.tsv",
-        out_subject="subject_embeddings_de",
-        out_object="object_embeddings_de"
-    )
-
-    extract_embeddings(
-        lang="ru",
-        ckpt="test-model-m2-no-alignment-wk5m60k-en-ru.ckpt",
-        data="test-multiG-m2-no-alignment-wk5m60k-en-ru.bin",
-        triples="wikidata5m_top200_ru_42k_descriptions_truncated.tsv",
-        out_subject="subject_embeddings_ru",
-        out_object="object_embeddings_ru"
-    )
-
-
-    extract_embeddings(
-        lang="en",
-        ckpt="test-model-m2-no-alignment-wk5m60k-en-ru.ckpt",
-        data="test-multiG-m2-no-alignment-wk5m60k-en-ru.bin",
-        triples="wikidata5m_top200_en_42k_descriptions_truncated.tsv",
-        out_subject="subject_embeddings_en2",
-        out_object="object_embeddings_en2"
-    )
+# The en-de and en-ru checkpoints are each loaded once and shared by both of
+# their languages; the four extractions then run in parallel.
+JOBS = [
+    dict(lang="en",
+         ckpt="test-model-m2-no-alignment-wk5m60k-en-de.ckpt",
+         data="test-multiG-m2-no-alignment-wk5m60k-en-de.bin",
+         triples="wikidata5m_top200_en_42k_descriptions_truncated.tsv",
+         out_subject="subject_embeddings_en",
+         out_object="object_embeddings_en"),
+    dict(lang="de",
+         ckpt="test-model-m2-no-alignment-wk5m60k-en-de.ckpt",
+         data="test-multiG-m2-no-alignment-wk5m60k-en-de.bin",
+         triples="wikidata5m_top200_de_42k_descriptions_truncated.tsv",
+         out_subject="subject_embeddings_de",
+         out_object="object_embeddings_de"),
+    dict(lang="ru",
+         ckpt="test-model-m2-no-alignment-wk5m60k-en-ru.ckpt",
+         data="test-multiG-m2-no-alignment-wk5m60k-en-ru.bin",
+         triples="wikidata5m_top200_ru_42k_descriptions_truncated.tsv",
+         out_subject="subject_embeddings_ru",
+         out_object="object_embeddings_ru"),
+    dict(lang="en",
+         ckpt="test-model-m2-no-alignment-wk5m60k-en-ru.ckpt",
+         data="test-multiG-m2-no-alignment-wk5m60k-en-ru.bin",
+         triples="wikidata5m_top200_en_42k_descriptions_truncated.tsv",
+         out_subject="subject_embeddings_en2",
+         out_object="object_embeddings_en2"),
+]
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--srcdir", default="src")
+    p.add_argument("--stream", action="store_true", help="bounded-memory, memory-mapped output")
+    p.add_argument("--chunk", type=int, default=65536)
+    p.add_argument("--server", default=None,
+                   help="embedding_server.py URL to fetch the tables from ('off': always in-process)")
+    a = p.parse_args(argv)
+
+    client, cache = connect(a.server), None
+    if client is None:
+        cache = ModelCache(srcdir=a.srcdir, capacity=2)
+        for job in JOBS:                 # load each checkpoint once, up front
+            cache.get(job["ckpt"], job["data"])
+    run_parallel(extract_embeddings, [dict(job, cache=cache, client=client, stream=a.stream, chunk=a.chunk)
+                                      for job in JOBS])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,190 @@
+"""
+fuzzy_match.py
+──────────────────────────────────────────────────────
+Fuzzy EN ↔ DE/RU entity-label matching, for seed dictionaries of
+`linear_map.py`.
+
+Labels are normalised with `fold` (NFKC, casefold, quotes and whitespace as
+in `label_lookup.canon`; with --translit also Cyrillic → Latin and accents
+dropped, so "Москва" and "Moskva", "München" and "Munchen" meet). Each
+target label is cut into padded character n-grams (`#mo`, `mos`, …) and an
+`NgramIndex` keeps one inverted list per n-gram as int32 arrays.
+
+For a block of source labels the postings of their n-grams are concatenated
+and shared n-grams are counted per (source, target) pair with one
+`np.unique` — n-grams in more than --max-df targets are too common to
+discriminate and are skipped there. The best candidates are then re-scored
+by the exact Dice coefficient 2·|A ∩ B| / (|A| + |B|) of their n-gram sets.
+Cost grows with the postings touched, not with #source × #target.
+
+Output TSV: source  target  score  rank — the first two columns are what
+`linear_map.py fit --dict` reads.
+
+python fuzzy_match.py --ckpt test-model-m2-no-alignment-wk5m60k-en-ru.ckpt \
+                      --data test-multiG-m2-no-alignment-wk5m60k-en-ru.bin \
+                      --src en --tgt ru --translit --k 3 --min-score 0.6 --out fuzzy_en_ru.tsv
+"""
+
+import argparse, csv, unicodedata
+from pathlib import Path
+
+import numpy as np
+
+from checkpoint_cache import ModelCache, kg_of
+from entity_ids import looks_like_qid, read_side_table
+from label_lookup import canon
+
+# ISO 9 / scholarly-style romanisation, close to how Wikidata EN labels spell Russian names
+_CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya", "і": "i", "ї": "yi", "є": "ye", "ґ": "g",
+}
+_TRANSLIT = str.maketrans(_CYRILLIC)
+
+
+def fold(label: str, translit=False) -> str:
+    """Matching form of a label: NFKC + casefold + `canon`; optionally romanised."""
+    s = canon(unicodedata.normalize("NFKC", label).casefold())
+    if translit:
+        s = unicodedata.normalize("NFKD", s.translate(_TRANSLIT))
+        s = "".join(c for c in s if not unicodedata.combining(c))
+    return s
+
+
+def ngrams(s: str, n=3):
+    s = f"#{s}#"
+    return {s[i:i + n] for i in range(max(1, len(s) - n + 1))}
+
+
+class NgramIndex:
+    """Inverted n-gram lists over one label table (CSR: gram id → target rows)."""
+
+    def __init__(self, labels, n=3, translit=False, max_df=0.02):
+        self.n, self.translit = n, translit
+        self.vocab = {}
+        rows, grams = [], []
+        for i, lbl in enumerate(labels):
+            if not lbl:
+                continue
+            for g in ngrams(fold(lbl, translit), n):
+                rows.append(i)
+                grams.append(self.vocab.setdefault(g, len(self.vocab)))
+        rows, grams = np.asarray(rows, np.int64), np.asarray(grams, np.int64)
+        self.num_targets = len(labels)
+        self.sizes = np.bincount(rows, minlength=len(labels))      # |grams| of every target
+        order = np.lexsort((rows, grams))
+        self.postings = rows[order].astype(np.int32)
+        self.indptr = np.zeros(len(self.vocab) + 1, np.int64)
+        np.cumsum(np.bincount(grams, minlength=len(self.vocab)), out=self.indptr[1:])
+        # (target, gram) keys for exact re-scoring
+        self.pair_keys = np.sort(rows * len(self.vocab) + grams)
+        self.max_df = max(1, int(max_df * len(labels))) if max_df <= 1 else int(max_df)
+
+    def encode(self, labels):
+        """labels → (query row, gram id) pairs; grams unknown to the index are dropped."""
+        q, g = [], []
+        for i, lbl in enumerate(labels):
+            if not lbl:
+                continue
+            ids = [self.vocab[x] for x in ngrams(fold(lbl, self.translit), self.n) if x in self.vocab]
+            q.extend([i] * len(ids))
+            g.extend(ids)
+        return np.asarray(q, np.int64), np.asarray(g, np.int64)
+
+    def _candidates(self, q, g, num_q, cand):
+        df = self.indptr[g + 1] - self.indptr[g]
+        keep = df <= self.max_df
+        q, g, df = q[keep], g[keep], df[keep]
+        if not len(q):
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        starts = np.repeat(self.indptr[g], df)
+        at = np.arange(df.sum()) - np.repeat(np.cumsum(df) - df, df)
+        t = self.postings[starts + at].astype(np.int64)
+        keys, shared = np.unique(np.repeat(q, df) * self.num_targets + t, return_counts=True)
+        qq, tt = keys // self.num_targets, keys % self.num_targets
+        order = np.lexsort((-shared, qq))                          # by query, most shared first
+        qq, tt = qq[order], tt[order]
+        first = np.searchsorted(qq, np.arange(num_q))
+        keep = np.arange(len(qq)) - first[qq] < cand
+        return qq[keep], tt[keep]
+
+    def _dice(self, q, g, q_size, cq, ct):
+        """exact Dice of (query cq[i], target ct[i]) pairs."""
+        lo, hi = np.searchsorted(q, cq, "left"), np.searchsorted(q, cq, "right")
+        cnt = hi - lo
+        pair = np.repeat(np.arange(len(cq)), cnt)
+        gram = g[np.repeat(lo, cnt) + np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt)]
+        key = ct[pair] * len(self.vocab) + gram
+        pos = np.minimum(np.searchsorted(self.pair_keys, key), len(self.pair_keys) - 1)
+        shared = np.bincount(pair[self.pair_keys[pos] == key], minlength=len(cq))
+        return 2 * shared / np.maximum(q_size[cq] + self.sizes[ct], 1)
+
+    def search(self, labels, k=5, cand=50, min_score=0.0, block=4096):
+        """Top-k targets of every label → (query rows, target rows, Dice scores, ranks)."""
+        out = [[], [], [], []]
+        for b in range(0, len(labels), block):
+            part = labels[b:b + block]
+            q, g = self.encode(part)
+            # query size counts all of its grams, also those unknown to the index
+            q_size = np.array([len(ngrams(fold(lbl, self.translit), self.n)) if lbl else 0
+                               for lbl in part], np.int64)
+            cq, ct = self._candidates(q, g, len(part), cand)
+            s = self._dice(q, g, q_size, cq, ct)
+            order = np.lexsort((-s, cq))
+            cq, ct, s = cq[order], ct[order], s[order]
+            rank = np.arange(len(cq)) - np.searchsorted(cq, cq) + 1
+            keep = (rank <= k) & (s >= min_score)
+            for lst, v in zip(out, (cq[keep] + b, ct[keep], s[keep], rank[keep])):
+                lst.append(v)
+        return tuple(np.concatenate(v) if v else np.zeros(0) for v in out)
+
+
+def side_labels(keys, table):
+    """Q-id keys → labels from a side table (None where unknown / not a Q-id)."""
+    rows = read_side_table(table)
+    return [rows.get(k, (None,))[0] if k and looks_like_qid(k) else k for k in keys]
+
+
+def write_pairs(path, src_keys, tgt_keys, q, t, s, rank):
+    with Path(path).open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar="\\", lineterminator="\n")
+        for qi, ti, si, ri in zip(q.tolist(), t.tolist(), s.tolist(), rank.tolist()):
+            w.writerow([src_keys[qi], tgt_keys[ti], f"{si:.4f}", ri])
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--ckpt", required=True)
+    p.add_argument("--data", required=True)
+    p.add_argument("--src", required=True, choices=["en", "de", "ru"])
+    p.add_argument("--tgt", required=True, choices=["en", "de", "ru"])
+    p.add_argument("--k", type=int, default=3, help="matches kept per source entity")
+    p.add_argument("--n", type=int, default=3, help="character n-gram length")
+    p.add_argument("--cand", type=int, default=50, help="candidates re-scored per source entity")
+    p.add_argument("--max-df", type=float, default=0.02,
+                   help="skip n-grams in more targets than this (fraction ≤ 1, or a count)")
+    p.add_argument("--min-score", type=float, default=0.5, help="minimum Dice score")
+    p.add_argument("--translit", action="store_true", help="romanise Cyrillic and drop accents")
+    p.add_argument("--src-table", help="entities.tsv side table: match its labels, write Q-ids")
+    p.add_argument("--tgt-table", help="entities.tsv side table of the target language")
+    p.add_argument("--srcdir", default="src")
+    p.add_argument("--out", required=True)
+    a = p.parse_args(argv)
+
+    snap = ModelCache(a.srcdir).get(a.ckpt, a.data)
+    src_keys, tgt_keys = snap.labels[kg_of(a.src)], snap.labels[kg_of(a.tgt)]
+    src_lbl = side_labels(src_keys, a.src_table) if a.src_table else src_keys
+    tgt_lbl = side_labels(tgt_keys, a.tgt_table) if a.tgt_table else tgt_keys
+
+    index = NgramIndex(tgt_lbl, a.n, a.translit, a.max_df)
+    print(f"🗃️  indexed {len(tgt_lbl)} {a.tgt.upper()} labels ({len(index.vocab)} {a.n}-grams)")
+    q, t, s, rank = index.search(src_lbl, a.k, a.cand, a.min_score)
+    write_pairs(a.out, src_keys, tgt_keys, q, t, s, rank)
+    print(f"✅ wrote {a.out} ({len(q)} pairs for {len(np.unique(q))} of {len(src_lbl)} {a.src.upper()} entities)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+knn.py
+──────────────────────────────────────────────────────
+Exact top-k cross-lingual nearest neighbours between two `vec_e` tables
+(e.g. EN = KG1 vs DE = KG2 of one checkpoint).
+
+Similarities are computed in (query block × target block) matmul tiles and
+reduced into a running top-k (`np.argpartition` on the first tile, then only
+the entries that beat each row's current k-th best), so memory is bounded by
+the tile size, never by #queries × #targets. Query blocks run on a thread
+pool (BLAS releases the GIL).
+
+Scoring:
+    cos   cosine similarity
+    csls  2·cos(x, y) − r_T(x) − r_S(y)   (Conneau et al., 2018), where r is the
+          mean cosine to the `csls_k` nearest neighbours in the other space.
+          The neighbourhood means are computed once per snapshot and kept
+          via `Snapshot.derived`.
+
+python knn.py --ckpt test-model-m2-no-alignment-wk5m60k-en-de.ckpt \
+              --data test-multiG-m2-no-alignment-wk5m60k-en-de.bin \
+              --src en --tgt de --k 10 --metric csls --out knn_en_de.tsv
+"""
+
+import argparse, csv, os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from checkpoint_cache import ModelCache, kg_of
+from label_lookup import LabelIndex
+
+
+def normalize(vec):
+    vec = np.asarray(vec, dtype=np.float32)
+    return vec / (np.linalg.norm(vec, axis=1, keepdims=True) + 1e-8)
+
+
+def _merge_topk(best_s, best_i, s, j, k):
+    """Fold tile `s` (target columns j…) into the running row-wise top-k, in place.
+
+    Only entries above a row's current k-th best (`best_s[:, 0]`) can enter,
+    so after the first tile the candidates are a small ragged set; they are
+    merged with the affected rows' top-k by one lexsort instead of an
+    argpartition over the whole tile.
+    """
+    r, c = np.nonzero(s > best_s[:, :1])
+    if not len(r):
+        return
+    hot, r = np.unique(r, return_inverse=True)        # rows with candidates, renumbered
+    n = len(hot)
+    rows = np.concatenate([np.repeat(np.arange(n), k), r])
+    vals = np.concatenate([best_s[hot].ravel(), s[hot[r], c]])
+    idx = np.concatenate([best_i[hot].ravel(), c + j])
+    order = np.lexsort((vals, rows))                   # by row, then ascending score
+    starts = np.searchsorted(rows[order], np.arange(1, n + 1)) - k
+    take = order[starts[:, None] + np.arange(k)]       # last k of every row
+    best_s[hot], best_i[hot] = vals[take], idx[take]
+
+
+def _topk_block(q, x, k, penalty, x_block):
+    """top-k rows of q against all of x, ascending within each row."""
+    best_s = best_i = None
+    buf = np.empty((len(q), min(x_block, len(x))), dtype=np.float32)   # reused by every tile
+    prep = x.prepare(q) if hasattr(x, "tile_scores") else None
+    for j in range(0, len(x), x_block):
+        if prep is None:
+            xb = x[j:j + x_block]
+            s = np.matmul(q, xb.T, out=buf[:, :len(xb)])
+        else:                                          # compressed index scores its own tiles
+            s = x.tile_scores(prep, j, buf[:, :min(x_block, len(x) - j)])
+        if penalty is not None:
+            s -= penalty[j:j + x_block]
+        if best_s is None:                             # first tile: plain argpartition
+            part = np.argpartition(s, -k, axis=1)[:, -k:]
+            best_s = np.take_along_axis(s, part, 1)
+            order = np.argsort(best_s, axis=1, kind="stable")
+            best_s, best_i = np.take_along_axis(best_s, order, 1), np.take_along_axis(part, order, 1) + j
+        else:
+            _merge_topk(best_s, best_i, s, j, k)
+    return best_s[:, ::-1], best_i[:, ::-1]            # best first
+
+
+def topk(q, x, k=10, penalty=None, q_block=1024, x_block=8192, workers=None):
+    """Row-wise top-k of q @ x.T − penalty → (scores [n, k], indices [n, k]).
+
+    q, x must already be unit-normalised for cosine. penalty: optional [len(x)]
+    vector subtracted from every score column (CSLS target term). x may be a
+    compressed index with `prepare(q)` / `tile_scores(prep, j, out)`
+    (quant_index.py), which then scores each tile in its own code domain
+    (`prepare` returning None falls back to decoded row slices).
+    """
+    k = min(k, len(x))
+    if not k or not len(q):
+        return np.zeros((len(q), k), np.float32), np.zeros((len(q), k), np.int64)
+    x_block = max(x_block, k)                          # first tile always holds k candidates
+    starts = range(0, len(q), q_block)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        parts = list(pool.map(lambda s: _topk_block(q[s:s + q_block], x, k, penalty, x_block), starts))
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+# ── snapshot-level helpers -----------------------------------------------------
+def unit_table(snap, kg):
+    return snap.derived(("unit", kg), lambda: normalize(snap.vec_e[kg]))
+
+
+def csls_radius(snap, kg_from, kg_to, csls_k=10, **kw):
+    """r: mean cosine of every `kg_from` entity to its csls_k neighbours in `kg_to`."""
+    src, tgt = unit_table(snap, kg_from), unit_table(snap, kg_to)   # outside the derived() lock
+
+    def build():
+        s, _ = topk(src, tgt, csls_k, **kw)
+        return s.mean(axis=1)
+    return snap.derived(("csls", kg_from, kg_to, csls_k), build)
+
+
+def neighbours(snap, src_kg, tgt_kg, query_idx=None, k=10, metric="cos", csls_k=10, **kw):
+    """Top-k `tgt_kg` entities for `src_kg` entities (all, or `query_idx`)."""
+    src, tgt = unit_table(snap, src_kg), unit_table(snap, tgt_kg)
+    q = src if query_idx is None else src[np.asarray(query_idx)]
+    if metric == "cos":
+        return topk(q, tgt, k, **kw)
+    if metric != "csls":
+        raise ValueError(f"unknown metric {metric!r}")
+
+    r_tgt = csls_radius(snap, tgt_kg, src_kg, csls_k, **kw)
+    r_src = csls_radius(snap, src_kg, tgt_kg, csls_k, **kw)
+    # cos − r_T(y)/2 ranks like 2·cos − r_T(y); rescale and add the per-query term after
+    s, i = topk(q, tgt, k, penalty=r_tgt / 2, **kw)
+    r_q = r_src if query_idx is None else r_src[np.asarray(query_idx)]
+    return 2 * s - r_q[:, None], i
+
+
+# ── CLI ------------------------------------------------------------------------
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--ckpt", required=True)
+    p.add_argument("--data", required=True)
+    p.add_argument("--src", required=True, choices=["en", "de", "ru"])
+    p.add_argument("--tgt", required=True, choices=["en", "de", "ru"])
+    p.add_argument("--queries", help="file with one source label per line (default: all entities)")
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--metric", default="cos", choices=["cos", "csls"])
+    p.add_argument("--csls-k", type=int, default=10)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--srcdir", default="src")
+    p.add_argument("--server", default=None,
+                   help="embedding_server.py URL for --queries lookups ('off': always in-process)")
+    p.add_argument("--out", required=True)
+    a = p.parse_args(argv)
+
+    from embedding_server import connect           # embedding_server imports this module
+    client = connect(a.server) if a.queries else None
+    if client:
+        with open(a.queries, encoding="utf-8") as f:
+            wanted = [line.rstrip("\n") for line in f if line.strip()]
+        queries, nbrs, scores, found = client.knn(a.ckpt, a.data, a.src, a.tgt, wanted, a.k, a.metric,
+                                                  csls_k=a.csls_k)
+        if not found.all():
+            print(f"⚠️  {int((~found).sum())} query labels not in {a.src.upper()}; skipped")
+        write_neighbours(a.out, queries, nbrs, scores.tolist(), a.metric)
+        return
+
+    snap = ModelCache(a.srcdir).get(a.ckpt, a.data)
+    src_kg, tgt_kg = kg_of(a.src), kg_of(a.tgt)
+    if src_kg == tgt_kg:
+        print("⚠️  source and target are the same KG of this checkpoint")
+
+    query_idx = None
+    if a.queries:
+        with open(a.queries, encoding="utf-8") as f:
+            wanted = [line.rstrip("\n") for line in f if line.strip()]
+        idx, found = LabelIndex(snap.labels[src_kg]).resolve(wanted)
+        if not found.all():
+            print(f"⚠️  {int((~found).sum())} query labels not in {a.src.upper()}; skipped")
+        query_idx = idx[found]
+
+    scores, nbrs = neighbours(snap, src_kg, tgt_kg, query_idx, a.k, a.metric, a.csls_k,
+                              workers=a.workers)
+    rows = np.arange(len(snap.vec_e[src_kg])) if query_idx is None else query_idx
+    src_lbl, tgt_lbl = snap.labels[src_kg], snap.labels[tgt_kg]
+
+    write_neighbours(a.out, [src_lbl[q] for q in rows.tolist()],
+                     [[tgt_lbl[n] for n in row] for row in nbrs.tolist()], scores.tolist(), a.metric)
+
+
+def write_neighbours(path, queries, nbrs, scores, metric):
+    with Path(path).open("w", encoding="utf-8", newline="") as fout:
+        w = csv.writer(fout, delimiter="\t")
+        w.writerow(["query", "rank", "neighbour", metric])
+        for q, s_row, n_row in zip(queries, scores, nbrs):
+            for rank, (s, n) in enumerate(zip(s_row, n_row), 1):
+                w.writerow([q, rank, n, f"{s:.6f}"])
+    print(f"✅ wrote {path} ({len(queries)} queries, {metric})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+label_lookup.py
+──────────────────────────────────────────────────────
+Batch label → embedding-row resolution.
+
+`LabelIndex.resolve` takes a whole column of labels and returns an int64
+row-index array plus a found-mask. Every distinct label is canonicalised
+and looked up once, however often it repeats in the column; vectors are
+then gathered with a single fancy-index (`LabelIndex.gather`).
+
+Lookup order per label is exact label first, then `canon(label)`. Missing
+labels resolve to -1 / mask False — index 0 is a valid hit (the old
+`id2idx.get(lbl) or id2idx.get(c)` silently dropped entity 0).
+
+`entity_ids.QidIndex` offers the same interface for Q-id keyed checkpoints;
+`entity_index` / `relation_index` pick one and memoise it on a checkpoint
+snapshot.
+"""
+
+import re
+
+import numpy as np
+
+from entity_ids import QidIndex
+
+# ── Canonicalize label (normalize for matching) ──
+_quote_re = re.compile(r"[\"“”„‟‶‷❝❞«»‹›]")
+_ws_re = re.compile(r"\s+")
+
+def canon(label: str) -> str:
+    """lower-case, strip all quotes, normalise whitespace"""
+    s = _quote_re.sub("", label)
+    s = _ws_re.sub(" ", s).strip().lower()
+    return s
+
+
+class LabelIndex:
+    """label / canonical label → row of one `vec_e` table.
+
+    A repeated label maps to its last row, or to its first with first=True.
+    """
+
+    def __init__(self, labels, first=False):
+        self.exact = {}
+        self.canonical = {}
+        for i, lbl in enumerate(labels):
+            if lbl is None:
+                continue
+            if first:
+                self.exact.setdefault(lbl, i)
+                self.canonical.setdefault(canon(lbl), i)
+            else:
+                self.exact[lbl] = i
+                self.canonical[canon(lbl)] = i
+
+    def lookup(self, lbl: str) -> int:
+        idx = self.exact.get(lbl)
+        if idx is None:
+            idx = self.canonical.get(canon(lbl), -1)
+        return idx
+
+    def resolve(self, column):
+        """labels → (int64 row indices, bool found-mask); -1 where missing."""
+        column = list(column)
+        codes = {lbl: self.lookup(lbl) for lbl in set(column)}
+        idx = np.fromiter(map(codes.__getitem__, column), dtype=np.int64, count=len(column))
+        return idx, idx >= 0
+
+    def gather(self, vec, column):
+        """vectors of the found labels (one fancy-index) and the found-mask."""
+        idx, found = self.resolve(column)
+        return vec[idx[found]], found
+
+
+def entity_index(snap, kg: int, key: str = "label"):
+    """LabelIndex / QidIndex over KG `kg` of a snapshot, built once per snapshot."""
+    if key == "qid":
+        return snap.derived(("qid", kg), lambda: QidIndex(snap.labels[kg]))
+    return snap.derived(("label", kg), lambda: LabelIndex(snap.labels[kg]))
+
+
+def relation_index(snap, kg: int, key: str = "label"):
+    """Same as `entity_index`, over the relation table (`vec_r`) of KG `kg`."""
+    if key == "qid":
+        return snap.derived(("rel-qid", kg), lambda: QidIndex(snap.rel_labels[kg]))
+    return snap.derived(("rel-label", kg), lambda: LabelIndex(snap.rel_labels[kg]))
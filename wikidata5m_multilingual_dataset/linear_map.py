@@ -0,0 +1,254 @@
+"""
+linear_map.py
+──────────────────────────────────────────────────────
+Post-hoc linear map between the language spaces of a no-alignment
+checkpoint (KG1 = EN, KG2 = DE/RU), learned from a seed dictionary.
+
+The seed dictionary is a TSV of (source key, target key) pairs — labels, or
+Q-ids with --key qid. It is streamed in chunks: each chunk's rows are
+gathered, unit-normalised and folded into d×d accumulators (XᵀY, XᵀX), so
+memory is O(chunk·d + d²) however many pairs there are. The map W
+(x ↦ x·W) is then solved in closed form:
+
+    procrustes  W = U·Vᵀ with U·Σ·Vᵀ = svd(XᵀY)          (orthogonal)
+    ridge       W = (XᵀX + λ·I)⁻¹ · XᵀY
+
+python linear_map.py fit   --ckpt test-model-m2-no-alignment-wk5m60k-en-de.ckpt \
+                           --data test-multiG-m2-no-alignment-wk5m60k-en-de.bin \
+                           --src en --tgt de --dict seed_en_de.tsv --out map_en_de.npz
+python linear_map.py apply --ckpt ... --data ... --map map_en_de.npz --out vec_en_in_de.npy
+
+Without a usable dictionary, `self-learn` refines a map VecMap-style: start
+from a small seed (default: entities whose label / Q-id is identical in both
+KGs), then alternate between solving W and re-inducing the dictionary as
+mutual nearest neighbours (cosine or CSLS) over a sampled vocabulary,
+until the mean similarity of the induced pairs stops improving. The map and
+dictionary of the best iteration are kept, not those of the last one.
+
+python linear_map.py self-learn --ckpt ... --data ... --src en --tgt de \
+                                --vocab 20000 --out map_en_de.npz --dict-out induced_en_de.tsv
+"""
+
+import argparse, csv
+from pathlib import Path
+
+import numpy as np
+
+from checkpoint_cache import ModelCache, kg_of
+from knn import normalize, topk, unit_table
+from label_lookup import entity_index
+from triple_io import iter_chunks
+
+
+class CrossCov:
+    """Streaming XᵀY / XᵀX accumulators over (source, target) row pairs."""
+
+    def __init__(self, d_src, d_tgt):
+        self.xty = np.zeros((d_src, d_tgt))
+        self.xtx = np.zeros((d_src, d_src))
+        self.n = 0
+
+    def update(self, x, y):
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        self.xty += x.T @ y
+        self.xtx += x.T @ x
+        self.n += len(x)
+
+    def add_pairs(self, src, tgt, s_idx, t_idx, chunk=65536, normed=True):
+        """Fold vec pairs (src[s_idx[i]], tgt[t_idx[i]]) in, `chunk` rows at a time."""
+        for i in range(0, len(s_idx), chunk):
+            x, y = src[s_idx[i:i + chunk]], tgt[t_idx[i:i + chunk]]
+            self.update(normalize(x) if normed else x, normalize(y) if normed else y)
+
+    def solve(self, method="procrustes", lam=1e-3):
+        if method == "procrustes":
+            u, _, vt = np.linalg.svd(self.xty)
+            return (u @ vt).astype(np.float32)
+        if method == "ridge":
+            return np.linalg.solve(self.xtx + lam * self.n * np.eye(len(self.xtx)), self.xty).astype(np.float32)
+        raise ValueError(f"unknown method {method!r}")
+
+
+def read_pairs(path, chunk=65536):
+    """Yield lists of (source key, target key) from a two-column TSV."""
+    with Path(path).open(encoding="utf-8") as f:
+        rows = (r[:2] for r in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE) if len(r) >= 2)
+        yield from iter_chunks(rows, chunk)
+
+
+def iter_resolved(snap, src_kg, tgt_kg, pairs, key="label"):
+    """Key-pair chunks → (source rows, target rows, #unresolved pairs) per chunk."""
+    src_index, tgt_index = entity_index(snap, src_kg, key), entity_index(snap, tgt_kg, key)
+    for part in pairs:
+        si, s_ok = src_index.resolve(p[0] for p in part)
+        ti, t_ok = tgt_index.resolve(p[1] for p in part)
+        ok = s_ok & t_ok
+        yield si[ok], ti[ok], int((~ok).sum())
+
+
+def resolve_pairs(snap, src_kg, tgt_kg, pairs, key="label"):
+    """Key-pair chunks → (source rows, target rows, #unresolved pairs)."""
+    s_idx, t_idx, skipped = [np.zeros(0, np.int64)], [np.zeros(0, np.int64)], 0
+    for si, ti, n_bad in iter_resolved(snap, src_kg, tgt_kg, pairs, key):
+        s_idx.append(si)
+        t_idx.append(ti)
+        skipped += n_bad
+    return np.concatenate(s_idx), np.concatenate(t_idx), skipped
+
+
+def fit(snap, src_kg, tgt_kg, pairs, method="procrustes", lam=1e-3, key="label", normed=True, chunk=65536):
+    """Solve W from a stream of key-pair chunks; returns (W, #pairs used, #pairs skipped)."""
+    src, tgt = snap.vec_e[src_kg], snap.vec_e[tgt_kg]
+    cov = CrossCov(src.shape[1], tgt.shape[1])
+    skipped = 0
+    for s_idx, t_idx, n_bad in iter_resolved(snap, src_kg, tgt_kg, pairs, key):
+        skipped += n_bad
+        cov.add_pairs(src, tgt, s_idx, t_idx, chunk, normed)
+    return cov.solve(method, lam), cov.n, skipped
+
+
+def save_map(path, W, **meta):
+    np.savez(path, W=W, **{k: np.asarray(v) for k, v in meta.items()})
+
+
+def load_map(path):
+    with np.load(path) as z:
+        return z["W"], {k: z[k].item() for k in z.files if k != "W"}
+
+
+def apply_map(vec, W, out=None, chunk=65536, normed=True):
+    """vec · W for a whole table, chunk by chunk; into a memory-mapped .npy if `out`."""
+    mapped = lambda rows: (normalize(rows) if normed else rows) @ W
+    if out is None:
+        return np.concatenate([mapped(vec[i:i + chunk]) for i in range(0, len(vec), chunk)])
+    table = np.lib.format.open_memmap(out, mode="w+", dtype=np.float32, shape=(len(vec), W.shape[1]))
+    for i in range(0, len(vec), chunk):
+        table[i:i + chunk] = mapped(vec[i:i + chunk])
+    table.flush()
+    return table
+
+
+# ── self-learning ----------------------------------------------------------------
+def identical_seed(snap, src_kg, tgt_kg, key="label"):
+    """(source rows, target rows) of entities with the same label / Q-id in both KGs."""
+    labels = snap.labels[src_kg]
+    rows = np.array([i for i, lbl in enumerate(labels) if lbl is not None], dtype=np.int64)
+    t_idx, ok = entity_index(snap, tgt_kg, key).resolve(labels[i] for i in rows)
+    return rows[ok], t_idx[ok]
+
+
+def mutual_nn(xs, xt, csls_k=10, **kw):
+    """Mutual nearest neighbours between unit row sets → (xs rows, xt rows, similarity)."""
+    if csls_k:
+        r_s = topk(xs, xt, csls_k, **kw)[0].mean(axis=1)
+        r_t = topk(xt, xs, csls_k, **kw)[0].mean(axis=1)
+    fwd = topk(xs, xt, 1, penalty=r_t / 2 if csls_k else None, **kw)[1][:, 0]
+    bwd = topk(xt, xs, 1, penalty=r_s / 2 if csls_k else None, **kw)[1][:, 0]
+    rows = np.flatnonzero(bwd[fwd] == np.arange(len(xs)))
+    return rows, fwd[rows], np.einsum("ij,ij->i", xs[rows], xt[fwd[rows]])
+
+
+def self_learn(snap, src_kg, tgt_kg, seed, method="procrustes", vocab=20000, iters=20,
+               tol=1e-3, csls_k=10, keep_seed=False, rng_seed=0, log=print, **kw):
+    """Alternate map fitting and mutual-NN dictionary induction over a sampled
+    vocabulary, until the mean mutual-NN cosine gains less than `tol`.
+    Returns the best iteration's (W, (source rows, target rows) W was fit on)."""
+    src, tgt = unit_table(snap, src_kg), unit_table(snap, tgt_kg)
+    rng = np.random.default_rng(rng_seed)
+    vs = np.sort(rng.choice(len(src), min(vocab, len(src)), replace=False))
+    vt = np.sort(rng.choice(len(tgt), min(vocab, len(tgt)), replace=False))
+    xt = tgt[vt]
+
+    s_idx, t_idx = seed
+    if not len(s_idx):
+        raise ValueError("self-learning needs at least one seed pair")
+    best, best_fit = -np.inf, None
+    for it in range(1, iters + 1):
+        cov = CrossCov(src.shape[1], tgt.shape[1])
+        cov.add_pairs(src, tgt, s_idx, t_idx, normed=False)
+        W = cov.solve(method)
+        rows, cols, sim = mutual_nn(normalize(src[vs] @ W), xt, csls_k, **kw)
+        objective = float(sim.mean()) if len(sim) else 0.0
+        log(f"🔁 iter {it}: {len(s_idx)} pairs in, {len(rows)} mutual pairs out, mean cos {objective:.4f}")
+        gain = objective - best
+        if gain > 0:                                   # a step that got worse never replaces the best map
+            best, best_fit = objective, (W, (s_idx, t_idx))
+        if gain < tol:
+            break
+        s_idx, t_idx = vs[rows], vt[cols]
+        if keep_seed:
+            pairs = np.unique(np.stack([np.concatenate([seed[0], s_idx]),
+                                        np.concatenate([seed[1], t_idx])]), axis=1)
+            s_idx, t_idx = pairs
+    return best_fit
+
+
+# ── CLI ------------------------------------------------------------------------
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="cmd", required=True)
+    for name in ("fit", "apply", "self-learn"):
+        s = sub.add_parser(name)
+        s.add_argument("--ckpt", required=True)
+        s.add_argument("--data", required=True)
+        s.add_argument("--srcdir", default="src")
+        s.add_argument("--chunk", type=int, default=65536)
+        s.add_argument("--out", required=True)
+    f = sub.choices["fit"]
+    f.add_argument("--src", required=True, choices=["en", "de", "ru"])
+    f.add_argument("--tgt", required=True, choices=["en", "de", "ru"])
+    f.add_argument("--dict", required=True, help="TSV of (source, target) key pairs")
+    f.add_argument("--key", default="label", choices=["label", "qid"])
+    f.add_argument("--method", default="procrustes", choices=["procrustes", "ridge"])
+    f.add_argument("--lam", type=float, default=1e-3, help="ridge strength (per pair)")
+    f.add_argument("--no-normalize", action="store_true", help="fit on raw, not unit, vectors")
+    sl = sub.choices["self-learn"]
+    sl.add_argument("--src", required=True, choices=["en", "de", "ru"])
+    sl.add_argument("--tgt", required=True, choices=["en", "de", "ru"])
+    sl.add_argument("--dict", help="seed TSV (default: identical labels / Q-ids)")
+    sl.add_argument("--key", default="label", choices=["label", "qid"])
+    sl.add_argument("--method", default="procrustes", choices=["procrustes", "ridge"])
+    sl.add_argument("--vocab", type=int, default=20000, help="entities sampled per side")
+    sl.add_argument("--iters", type=int, default=20)
+    sl.add_argument("--tol", type=float, default=1e-3, help="stop when mean cos gains less")
+    sl.add_argument("--csls-k", type=int, default=10, help="0 = plain cosine retrieval")
+    sl.add_argument("--keep-seed", action="store_true", help="keep seed pairs in every dictionary")
+    sl.add_argument("--dict-out", help="write the induced dictionary here")
+    ap = sub.choices["apply"]
+    ap.add_argument("--map", required=True)
+    ap.add_argument("--lang", help="table to map (default: the map's source language)")
+    a = p.parse_args(argv)
+
+    snap = ModelCache(a.srcdir).get(a.ckpt, a.data)
+    if a.cmd == "fit":
+        W, n, skipped = fit(snap, kg_of(a.src), kg_of(a.tgt), read_pairs(a.dict, a.chunk),
+                            a.method, a.lam, a.key, not a.no_normalize, a.chunk)
+        save_map(a.out, W, src=a.src, tgt=a.tgt, method=a.method, normed=not a.no_normalize,
+                 pairs=n, ckpt=a.ckpt)
+        print(f"✅ {a.method} map {a.src}→{a.tgt} from {n} pairs ({skipped} unresolved) → {a.out}")
+    elif a.cmd == "self-learn":
+        src_kg, tgt_kg = kg_of(a.src), kg_of(a.tgt)
+        if a.dict:
+            seed = resolve_pairs(snap, src_kg, tgt_kg, read_pairs(a.dict, a.chunk), a.key)[:2]
+        else:
+            seed = identical_seed(snap, src_kg, tgt_kg, a.key)
+        print(f"🌱 {len(seed[0])} seed pairs")
+        W, (s_idx, t_idx) = self_learn(snap, src_kg, tgt_kg, seed, a.method, a.vocab, a.iters,
+                                       a.tol, a.csls_k, a.keep_seed)
+        save_map(a.out, W, src=a.src, tgt=a.tgt, method=a.method, normed=True,
+                 pairs=len(s_idx), ckpt=a.ckpt, self_learned=True)
+        if a.dict_out:
+            with open(a.dict_out, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar="\\")
+                w.writerows((snap.labels[src_kg][i], snap.labels[tgt_kg][j])
+                            for i, j in zip(s_idx.tolist(), t_idx.tolist()))
+        print(f"✅ self-learned {a.method} map {a.src}→{a.tgt} ({len(s_idx)} induced pairs) → {a.out}")
+    else:
+        W, meta = load_map(a.map)
+        lang = a.lang or meta["src"]
+        apply_map(snap.vec_e[kg_of(lang)], W, a.out, a.chunk, bool(meta.get("normed", True)))
+        print(f"✅ mapped {lang.upper()} vec_e ({len(snap.vec_e[kg_of(lang)])} rows) → {a.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+link_prediction.py
+──────────────────────────────────────────────────────
+Filtered link prediction (MRR, Hits@1/3/10) of one KG of a checkpoint on
+held-out triples.
+
+For every test triple (h, r, t) all entities are scored as tail of (h, r, ?)
+and as head of (?, r, t) with the TransE distance the model was trained with
+(L1 or L2, `multiG.L1`): ||q − e|| with q = h + r resp. q = t − r. Distances
+are computed in (query block × entity block) tiles — matmuls for L2 — and the
+rank of the gold entity is 1 + the number of entities strictly closer.
+
+"Filtered" ranks skip every other entity that forms a known triple (train /
+valid / test files given with --known): each triple is packed into one int64
+key, and the true tails of every (h, r) and true heads of every (r, t) are
+found with one vectorised `searchsorted` per query block. Raw ranks are
+reported too.
+
+Triple files: mTransE CSVs (`head@@@relation@@@tail`, labels or Q-ids) or
+the triple TSVs (labels / Q-ids with --key qid).
+
+python link_prediction.py --ckpt test-model-m2-no-alignment-wk5m60k-en-de.ckpt \
+                          --data test-multiG-m2-no-alignment-wk5m60k-en-de.bin \
+                          --lang en --test en_test.csv --known en_train.csv en_valid.csv \
+                          --out lp_en.json
+
+--watch keeps running next to `train_MTransE`: whenever the checkpoint files
+change (and have settled) it evaluates them in a fresh, niced, CPU-only child
+process and appends one JSON line per checkpoint to --out.
+"""
+
+import argparse, json, os, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from checkpoint_cache import ModelCache, kg_of
+from entity_ids import relation_key, triple_keys
+from label_lookup import entity_index, relation_index
+from triple_io import iter_chunks, triple_reader
+
+HITS = (1, 3, 10)
+
+
+# ── triples ------------------------------------------------------------------
+def read_triples(path, key="label", chunk=65536):
+    """Yield lists of (head, relation, tail) keys from an `@@@` CSV or a triple TSV."""
+    with Path(path).open(encoding="utf-8", newline="") as f:
+        first = f.readline()
+        f.seek(0)
+        if "@@@" in first:
+            rows = (line.rstrip("\n").split("@@@") for line in f)
+            yield from iter_chunks((r for r in rows if len(r) == 3), chunk)
+            return
+        rdr, _ = triple_reader(f)
+        rows = ((*triple_keys(r, key), relation_key(r, key)) for r in rdr if len(r) >= 3)
+        yield from iter_chunks(((s, p, o) for s, o, p in rows), chunk)
+
+
+def resolve_triples(snap, kg, paths, key="label"):
+    """Triple files → int64 [n, 3] (h, r, t) rows of KG `kg`, #unresolved rows."""
+    ents, rels = entity_index(snap, kg, key), relation_index(snap, kg, key)
+    out, skipped = [np.zeros((0, 3), np.int64)], 0
+    for path in paths:
+        for part in read_triples(path, key):
+            h, h_ok = ents.resolve(p[0] for p in part)
+            r, r_ok = rels.resolve(p[1] for p in part)
+            t, t_ok = ents.resolve(p[2] for p in part)
+            ok = h_ok & r_ok & t_ok
+            out.append(np.stack([h[ok], r[ok], t[ok]], axis=1))
+            skipped += int((~ok).sum())
+    return np.concatenate(out), skipped
+
+
+class KnownTriples:
+    """Known-triple index: true tails of every (h, r), true heads of every (r, t).
+
+    (h, r, t) is packed as one int64 key per direction; the sorted keys are
+    grouped by their (h, r) / (r, t) prefix, so all answers of a query are one
+    contiguous slice.
+    """
+
+    def __init__(self, triples, num_ents, num_rels):
+        self.n, self.nr = int(num_ents), int(num_rels)
+        h, r, t = (np.asarray(triples, dtype=np.int64)[:, i] for i in range(3))
+        self._tails = np.unique((h * self.nr + r) * self.n + t)      # group (h, r) → t
+        self._heads = np.unique((t * self.nr + r) * self.n + h)      # group (t, r) → h
+
+    def __len__(self):
+        return len(self._tails)
+
+    @staticmethod
+    def _answers(keys, group, n):
+        lo = np.searchsorted(keys, group * n)
+        hi = np.searchsorted(keys, (group + 1) * n)
+        rows = np.repeat(np.arange(len(group)), hi - lo)
+        at = np.arange(len(rows)) - np.repeat(np.cumsum(hi - lo) - (hi - lo), hi - lo)
+        return rows, keys[np.repeat(lo, hi - lo) + at] % n
+
+    def tails(self, h, r):
+        """(query row, true tail) pairs for queries (h[i], r[i], ?)."""
+        return self._answers(self._tails, h * self.nr + r, self.n)
+
+    def heads(self, r, t):
+        """(query row, true head) pairs for queries (?, r[i], t[i])."""
+        return self._answers(self._heads, t * self.nr + r, self.n)
+
+
+# ── ranking ------------------------------------------------------------------
+def _dist_tile(q, xb, xx, L1, buf):
+    """Distances q → xb, monotone in ||q − x|| (squared L2 without the |q|² term)."""
+    if L1:
+        return np.abs(q[:, None, :] - xb[None, :, :]).sum(axis=2)
+    s = np.matmul(q, xb.T, out=buf[:, :len(xb)])
+    s *= -2
+    s += xx
+    return s
+
+
+def _ranks_block(q, gold, known_r, known_c, x, xx, L1, x_block):
+    g = x[gold]
+    gold_d = np.abs(q - g).sum(axis=1) if L1 else xx[gold] - 2 * np.einsum("ij,ij->i", q, g)
+    raw = np.zeros(len(q), dtype=np.int64)
+    filt = np.zeros(len(q), dtype=np.int64)
+    buf = np.empty((len(q), min(x_block, len(x))), dtype=np.float32)
+    rows = np.arange(len(q))
+    for j in range(0, len(x), x_block):
+        xb = x[j:j + x_block]
+        d = _dist_tile(q, xb, xx[j:j + x_block], L1, buf)
+        closer = np.count_nonzero(d < gold_d[:, None], axis=1)
+        # the gold column may round a hair below gold_d; never count it
+        gr = rows[(gold >= j) & (gold < j + len(xb))]
+        closer[gr] -= d[gr, gold[gr] - j] < gold_d[gr]
+        raw += closer
+        # filtered: other known answers in this tile do not count either
+        m = (known_c >= j) & (known_c < j + len(xb)) & (known_c != gold[known_r])
+        kr, kc = known_r[m], known_c[m] - j
+        closer -= np.bincount(kr[d[kr, kc] < gold_d[kr]], minlength=len(q))
+        filt += closer
+    return raw + 1, filt + 1
+
+
+def rank_entities(q, gold, known, x, L1=False, q_block=256, x_block=8192, workers=None):
+    """Raw and filtered 1-based ranks of x[gold[i]] by distance to q[i].
+
+    known: (query row, entity) pairs that are true answers of the queries.
+    """
+    q = np.asarray(q, dtype=np.float32)
+    x = np.asarray(x, dtype=np.float32)
+    xx = np.zeros(len(x), np.float32) if L1 else np.einsum("ij,ij->i", x, x)
+    if L1:                                              # 3-D tiles: keep them small
+        x_block = max(1, min(x_block, (1 << 24) // max(1, q_block * x.shape[1])))
+    gold = np.asarray(gold, dtype=np.int64)
+    known_r, known_c = known
+    order = np.argsort(known_r, kind="stable")
+    known_r, known_c = known_r[order], known_c[order]
+    starts = range(0, len(q), q_block)
+
+    def block(s):
+        lo, hi = np.searchsorted(known_r, [s, s + q_block])
+        return _ranks_block(q[s:s + q_block], gold[s:s + q_block], known_r[lo:hi] - s,
+                            known_c[lo:hi], x, xx, L1, x_block)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        parts = list(pool.map(block, starts))
+    empty = np.zeros(0, np.int64)
+    return (np.concatenate([p[0] for p in parts] or [empty]),
+            np.concatenate([p[1] for p in parts] or [empty]))
+
+
+def summarize(ranks):
+    out = {f"hits@{k}": float(np.mean(ranks <= k)) if len(ranks) else 0.0 for k in HITS}
+    out["mrr"] = float(np.mean(1.0 / ranks)) if len(ranks) else 0.0
+    out["mr"] = float(np.mean(ranks)) if len(ranks) else 0.0
+    return out
+
+
+def evaluate(snap, kg, test, known, **kw):
+    """{"raw": {...}, "filtered": {...}} over head and tail prediction of `test`."""
+    ent, rel = snap.vec_e[kg].astype(np.float32), snap.vec_r[kg].astype(np.float32)
+    h, r, t = test[:, 0], test[:, 1], test[:, 2]
+    raw_t, filt_t = rank_entities(ent[h] + rel[r], t, known.tails(h, r), ent, snap.L1, **kw)
+    raw_h, filt_h = rank_entities(ent[t] - rel[r], h, known.heads(r, t), ent, snap.L1, **kw)
+    raw, filt = np.concatenate([raw_h, raw_t]), np.concatenate([filt_h, filt_t])
+    return {"raw": summarize(raw), "filtered": summarize(filt),
+            "filtered_head": summarize(filt_h), "filtered_tail": summarize(filt_t)}
+
+
+# ── watcher ------------------------------------------------------------------
+def checkpoint_stamp(ckpt):
+    """(path, size, mtime) of the files a TF saver writes for `ckpt`; () if absent."""
+    p = Path(ckpt)
+    files = sorted(p.parent.glob(p.name + ".*")) or ([p] if p.exists() else [])
+    return tuple((f.name, f.stat().st_size, f.stat().st_mtime_ns) for f in files if f.is_file())
+
+
+def watch(argv, ckpt, poll=30.0, settle=10.0, once=False):
+    """Evaluate `ckpt` in a child process every time its files change."""
+    seen = None
+    print(f"👀 watching {ckpt} (poll {poll:.0f}s)")
+    while True:
+        stamp = checkpoint_stamp(ckpt)
+        if stamp and stamp != seen:
+            time.sleep(settle)                          # let the saver finish writing
+            if checkpoint_stamp(ckpt) != stamp:
+                continue
+            seen = stamp
+            env = dict(os.environ, CUDA_VISIBLE_DEVICES="")    # keep the GPU for training
+            cmd = [sys.executable, os.path.abspath(__file__), *argv, "--append"]
+            print(f"🔎 new checkpoint {ckpt}, evaluating")
+            rc = subprocess.call(cmd, env=env, preexec_fn=lambda: os.nice(19))
+            if rc:
+                print(f"⚠️  evaluation exited with {rc}")
+            if once:
+                return
+        time.sleep(poll)
+
+
+# ── main ---------------------------------------------------------------------
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    p = argparse.ArgumentParser()
+    p.add_argument("--ckpt", required=True)
+    p.add_argument("--data", required=True)
+    p.add_argument("--lang", required=True, choices=["en", "de", "ru"])
+    p.add_argument("--test", required=True, help="held-out triples to rank")
+    p.add_argument("--known", nargs="*", default=[],
+                   help="triples filtered from the ranking (the test file is always included)")
+    p.add_argument("--key", default="label", choices=["label", "qid"])
+    p.add_argument("--sample", type=int, default=None, help="evaluate a random subset of the test triples")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--srcdir", default="src")
+    p.add_argument("--out", required=True, help="JSON results file (JSON lines with --watch)")
+    p.add_argument("--append", action="store_true", help="append one JSON line instead of overwriting")
+    p.add_argument("--watch", action="store_true", help="re-evaluate every new checkpoint until killed")
+    p.add_argument("--poll", type=float, default=30.0, help="--watch: seconds between checks")
+    a = p.parse_args(argv)
+
+    if a.watch:
+        return watch([x for x in argv if x != "--watch"], a.ckpt, a.poll)
+
+    t0 = time.perf_counter()
+    stamp = checkpoint_stamp(a.ckpt)
+    snap = ModelCache(a.srcdir).get(a.ckpt, a.data)
+    kg = kg_of(a.lang)
+    test, skipped = resolve_triples(snap, kg, [a.test], a.key)
+    known, _ = resolve_triples(snap, kg, a.known, a.key)
+    known = KnownTriples(np.concatenate([known, test]), len(snap.vec_e[kg]), len(snap.vec_r[kg]))
+    if a.sample and a.sample < len(test):
+        test = test[np.random.default_rng(0).choice(len(test), a.sample, replace=False)]
+
+    t1 = time.perf_counter()
+    result = evaluate(snap, kg, test, known, workers=a.workers)
+    result.update(ckpt=a.ckpt, data=a.data, lang=a.lang, test=a.test, known=a.known,
+                  ckpt_mtime=max((s[2] for s in stamp), default=0) / 1e9,
+                  distance="L1" if snap.L1 else "L2", triples=int(len(test)), unresolved=skipped,
+                  known_triples=len(known), entities=int(len(snap.vec_e[kg])),
+                  eval_seconds=round(time.perf_counter() - t1, 3),
+                  total_seconds=round(time.perf_counter() - t0, 3))
+    with open(a.out, "a" if a.append else "w", encoding="utf-8") as f:
+        if a.append:
+            f.write(json.dumps(result) + "\n")
+        else:
+            json.dump(result, f, indent=2)
+    f = result["filtered"]
+    print(" ".join(f"{k}={f[k]:.4f}" for k in [f"hits@{k}" for k in HITS] + ["mrr"]),
+          f"(filtered, {len(test)} triples, {skipped} unresolved) → {a.out}")
+
+
+if __name__ == "__main__":
+    main()
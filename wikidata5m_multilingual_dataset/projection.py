@@ -0,0 +1,183 @@
+"""
+projection.py
+──────────────────────────────────────────────────────
+2-D projections of embedding tables for the plotting scripts, cached on disk.
+
+    coords = project(x, method="tsne")          # [n, 2]
+    parts  = project_rows(subj, obj, ...)       # one [rows, 2] array per input
+
+Pipeline: PCA pre-reduction to --pca-dim (50) dimensions when the input is
+wider, then
+
+    tsne   openTSNE (FFT-accelerated, multi-threaded) if installed, else
+           scikit-learn's Barnes-Hut t-SNE
+    umap   umap-learn
+    pca    the first two principal components
+
+The 2-D result is stored under `cache_dir` as `<sha1>.npy`, where the SHA-1
+covers the input bytes, shape, dtype, method, the package and version that
+computes it (`backend`: openTSNE and scikit-learn give different layouts)
+and every parameter, so
+re-plotting with other highlights or colours reads the coordinates back in
+well under a second. `project_rows` projects only the distinct vectors (see
+`entity_store.unique_rows`) and scatters the coordinates back to every row.
+
+Out-of-sample placement: `save_map` keeps a fitted map (reference vectors +
+their 2-D coordinates). `place` puts new vectors onto it without
+re-projecting: a vector already in the map keeps its coordinates exactly,
+and any other vector lands at the similarity-weighted mean of its k nearest
+reference vectors (cosine, `knn.topk`). Cost is O(new × reference) matmuls,
+and the existing layout never moves.
+"""
+
+import hashlib, importlib, json, os, time
+from pathlib import Path
+
+import numpy as np
+
+from entity_store import row_keys, unique_rows
+from knn import normalize, topk
+
+METHODS = ["tsne", "umap", "pca"]
+BACKENDS = {"tsne": [("openTSNE", "openTSNE"), ("sklearn", "scikit-learn")],   # tried in this order
+            "umap": [("umap", "umap-learn")],
+            "pca": [("numpy", "numpy")]}
+DEFAULT_CACHE = ".proj_cache"
+
+
+def pca(x, dim=50):
+    """Rows of x on their first `dim` principal axes (no-op when x is not wider)."""
+    x = np.asarray(x, dtype=np.float32)
+    if x.shape[1] <= dim:
+        return x
+    centred = x - x.mean(axis=0)
+    # eigenvectors of the d×d covariance: cheaper than an SVD of the n×d matrix
+    w, v = np.linalg.eigh(centred.T @ centred)
+    return centred @ v[:, np.argsort(w)[::-1][:dim]]
+
+
+def _tsne(x, perplexity, seed, n_jobs):
+    try:
+        from openTSNE import TSNE
+        return np.asarray(TSNE(perplexity=perplexity, n_jobs=n_jobs, random_state=seed).fit(x))
+    except ImportError:
+        from sklearn.manifold import TSNE
+        return TSNE(n_components=2, perplexity=perplexity, random_state=seed,
+                    method="barnes_hut", n_jobs=n_jobs).fit_transform(x)
+
+
+def _umap(x, seed, n_neighbors, min_dist):
+    try:
+        import umap
+    except ImportError:
+        raise SystemExit("❌ method 'umap' needs umap-learn (pip install umap-learn)")
+    return umap.UMAP(n_components=2, n_neighbors=n_neighbors, min_dist=min_dist,
+                     random_state=seed).fit_transform(x)
+
+
+def backend(method):
+    """'<package> <version>' that computes `method` here, None if none is installed."""
+    for module, name in BACKENDS[method]:
+        try:
+            return f"{name} {importlib.import_module(module).__version__}"
+        except ImportError:
+            continue
+    return None
+
+
+def cache_key(x, method, params):
+    h = hashlib.sha1()
+    h.update(json.dumps([method, list(x.shape), str(x.dtype), params], sort_keys=True).encode())
+    h.update(np.ascontiguousarray(x).data)
+    return h.hexdigest()
+
+
+def project(x, method="tsne", perplexity=30, seed=42, pca_dim=50, n_neighbors=15, min_dist=0.1,
+            n_jobs=-1, cache_dir=DEFAULT_CACHE):
+    """2-D coordinates of every row of x; read from / written to `cache_dir` (None: no cache)."""
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}")
+    x = np.asarray(x, dtype=np.float32)
+    params = dict(perplexity=perplexity, seed=seed, pca_dim=pca_dim)
+    if method == "umap":
+        params.update(n_neighbors=n_neighbors, min_dist=min_dist)
+    params.update(backend=backend(method))
+    path = None
+    if cache_dir:
+        path = Path(cache_dir) / f"{cache_key(x, method, params)}.npy"
+        if path.exists():
+            print(f"🗃️  {method} coordinates from cache ({path})")
+            return np.load(path)
+
+    t0 = time.perf_counter()
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+    if method == "pca":
+        coords = pca(x, 2)
+    elif method == "umap":
+        coords = _umap(pca(x, pca_dim), seed, n_neighbors, min_dist)
+    else:
+        coords = _tsne(pca(x, pca_dim), min(perplexity, max(1, (len(x) - 1) / 3)), seed, n_jobs)
+    coords = np.asarray(coords, dtype=np.float32)
+    print(f"📐 {method} of {len(x)} points in {time.perf_counter() - t0:.1f}s")
+
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npy")
+        np.save(tmp, coords)
+        os.replace(tmp, path)
+    return coords
+
+
+def project_rows(*parts, save_to=None, **kw):
+    """Project the distinct vectors of all parts together; one [len(part), 2] array per part.
+    save_to: also keep the result as a map for `place_rows`."""
+    unique, inverse = unique_rows(*parts)
+    print(f"📍 {len(unique)} unique of {sum(len(i) for i in inverse)} vectors")
+    coords = project(unique, **kw)
+    if save_to:
+        save_map(save_to, unique, coords, **kw)
+    return [coords[inv] for inv in inverse]
+
+
+# ── out-of-sample placement ---------------------------------------------------
+def save_map(path, vectors, coords, **params):
+    """Persist a fitted projection: reference vectors, their coordinates, parameters."""
+    np.savez(path, vectors=np.asarray(vectors, dtype=np.float32),
+             coords=np.asarray(coords, dtype=np.float32), params=json.dumps(params))
+    print(f"💾 saved projection map {path} ({len(coords)} points)")
+
+
+def load_map(path):
+    """(reference vectors, coordinates, parameters) of a `save_map` file."""
+    with np.load(path) as z:
+        return z["vectors"], z["coords"], json.loads(str(z["params"]))
+
+
+def place(x, ref_vectors, ref_coords, k=10, **kw):
+    """2-D coordinates of x on an existing map (see module docstring)."""
+    x = np.asarray(x, dtype=np.float32)
+    coords = np.empty((len(x), 2), dtype=np.float32)
+    keys = row_keys(np.asarray(ref_vectors, dtype=np.float32))
+    order = np.argsort(keys)
+    pos = np.minimum(np.searchsorted(keys[order], row_keys(x)), len(keys) - 1)
+    known = keys[order][pos] == row_keys(x)
+    coords[known] = ref_coords[order[pos[known]]]
+
+    new = np.flatnonzero(~known)
+    if len(new):
+        t0 = time.perf_counter()
+        s, i = topk(normalize(x[new]), normalize(ref_vectors), k, **kw)
+        w = 1.0 / np.maximum(1.0 - s, 1e-6)               # inverse cosine distance
+        w /= w.sum(axis=1, keepdims=True)
+        coords[new] = np.einsum("nk,nkc->nc", w, ref_coords[i])
+        print(f"📌 placed {len(new)} new points by {k}-NN in {time.perf_counter() - t0:.1f}s")
+    print(f"📍 {int(known.sum())} points already on the map")
+    return coords
+
+
+def place_rows(*parts, map_path, k=10, **kw):
+    """`project_rows` onto a saved map: one [len(part), 2] array per part."""
+    unique, inverse = unique_rows(*parts)
+    ref_vectors, ref_coords, _ = load_map(map_path)
+    coords = place(unique, ref_vectors, ref_coords, k, **kw)
+    return [coords[inv] for inv in inverse]
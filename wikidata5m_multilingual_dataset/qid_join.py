@@ -0,0 +1,185 @@
+"""
+qid_join.py
+──────────────────────────────────────────────────────
+Exact cross-lingual entity correspondences from the per-language triple TSVs.
+
+The labels / descriptions TSVs of `sample_wikidata_triples.py` keep the
+subject / object Q-ids in every language, so the same Wikidata entity can
+be joined across EN / DE / RU without any label matching. `QidTable`
+streams each file once and keeps, per language, the first TSV row (0-based,
+header excluded) each entity occurs in and its label in that language:
+
+    qids     int64  [M]        sorted union of all Q-ids
+    row_en   int32  [M]        -1 where EN has no triple with that entity
+    row_de   int32  [M]
+    ...
+
+The table is saved as one .npz (labels alongside as .tsv), and an aligned
+pair file is written for every language pair:
+
+    <src key>  <tgt key>  qid  [cos]
+
+With --key label the keys are the labels of each language (what label-keyed
+checkpoints and `linear_map.py fit --dict` expect); with --key qid both are
+the Q-id. Give checkpoints with --model to append the cosine of the two
+entities, resolved and scored in one batch per pair file.
+
+python qid_join.py --tsv en=wikidata5m_top200_en_60k_labels.tsv \
+                   --tsv de=wikidata5m_top200_de_60k_labels.tsv \
+                   --tsv ru=wikidata5m_top200_ru_60k_labels.tsv \
+                   --model en-de=test-model-m2-no-alignment-wk5m60k-en-de.ckpt:test-multiG-m2-no-alignment-wk5m60k-en-de.bin \
+                   --out qid_join
+"""
+
+import argparse, csv
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+from checkpoint_cache import ModelCache, kg_of
+from entity_ids import int_to_qid, looks_like_qid, qid_to_int, triple_keys
+from knn import unit_table
+from label_lookup import entity_index
+from triple_io import triple_reader
+
+
+def scan_entities(path):
+    """One pass over a triple TSV → (sorted Q-ids, first row, label) arrays."""
+    first = {}
+    with Path(path).open(encoding="utf-8") as fin:
+        rdr, _ = triple_reader(fin)
+        for i, row in enumerate(rdr):
+            if len(row) < 6:
+                continue
+            for qid, lbl in zip(triple_keys(row, "qid"), triple_keys(row, "label")):
+                if qid not in first and looks_like_qid(qid):
+                    first[qid] = (i, lbl)
+    qids = np.fromiter((qid_to_int(q) for q in first), dtype=np.int64, count=len(first))
+    rows = np.fromiter((v[0] for v in first.values()), dtype=np.int32, count=len(first))
+    labels = np.array([v[1] for v in first.values()], dtype=object)
+    order = np.argsort(qids)
+    return qids[order], rows[order], labels[order]
+
+
+class QidTable:
+    """Q-id → (first row, label) per language, as sorted aligned columns."""
+
+    def __init__(self, qids, rows: dict, labels: dict):
+        self.qids, self.rows, self.labels = qids, rows, labels
+
+    @classmethod
+    def from_tsvs(cls, tsvs: dict):
+        scans = {lang: scan_entities(path) for lang, path in tsvs.items()}
+        qids = np.unique(np.concatenate([s[0] for s in scans.values()] or [np.zeros(0, np.int64)]))
+        rows, labels = {}, {}
+        for lang, (q, r, lbl) in scans.items():
+            pos = np.searchsorted(qids, q)
+            rows[lang] = np.full(len(qids), -1, dtype=np.int32)
+            rows[lang][pos] = r
+            labels[lang] = np.full(len(qids), None, dtype=object)
+            labels[lang][pos] = lbl
+        return cls(qids, rows, labels)
+
+    @property
+    def langs(self):
+        return list(self.rows)
+
+    def pairs(self, src, tgt):
+        """positions of the Q-ids present in both languages."""
+        return np.flatnonzero((self.rows[src] >= 0) & (self.rows[tgt] >= 0))
+
+    def keys(self, lang, pos, key="label"):
+        if key == "qid":
+            return [int_to_qid(q) for q in self.qids[pos].tolist()]
+        return self.labels[lang][pos].tolist()
+
+    def save(self, prefix):
+        np.savez(f"{prefix}.npz", qids=self.qids, **{f"row_{lang}": r for lang, r in self.rows.items()})
+        with Path(f"{prefix}_labels.tsv").open("w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar="\\", lineterminator="\n")
+            w.writerow(["qid"] + self.langs)
+            cols = [self.labels[lang].tolist() for lang in self.langs]
+            for i, q in enumerate(self.qids.tolist()):
+                w.writerow([int_to_qid(q)] + ["" if c[i] is None else c[i] for c in cols])
+
+
+# ── cross-lingual cosine -----------------------------------------------------
+def pair_cosine(snaps, src, tgt, src_keys, tgt_keys, key="label"):
+    """cos(src entity, tgt entity) per pair; NaN where either side has no embedding.
+
+    snaps: {lang: Snapshot holding that language}; if both languages live in the
+    same checkpoint its KG1 / KG2 tables are compared.
+    """
+    vecs = []
+    for lang, keys in ((src, src_keys), (tgt, tgt_keys)):
+        snap, kg = snaps[lang], kg_of(lang)
+        idx, found = entity_index(snap, kg, key).resolve(keys)
+        vecs.append((unit_table(snap, kg), idx, found))
+    (xs, si, s_ok), (xt, ti, t_ok) = vecs
+    ok = s_ok & t_ok
+    out = np.full(len(src_keys), np.nan)
+    out[ok] = np.einsum("ij,ij->i", xs[si[ok]], xt[ti[ok]])
+    return out
+
+
+def models_by_lang(models, cache, pair):
+    """{lang: Snapshot} for one language pair, preferring a checkpoint that holds both."""
+    both = [m for m in models if set(pair) <= set(m)]
+    chosen = {}
+    for lang in pair:
+        names = both or [m for m in models if lang in m]
+        if names:
+            chosen[lang] = cache.get(*models[names[0]])
+    if len(chosen) < 2:
+        return None
+    if not both:
+        print(f"⚠️  no checkpoint holds both {pair[0].upper()} and {pair[1].upper()}; "
+              f"cos compares two independently trained spaces")
+    return chosen
+
+
+def write_pair_file(path, src_keys, tgt_keys, qids, cos=None):
+    with Path(path).open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar="\\", lineterminator="\n")
+        for i, (s, t, q) in enumerate(zip(src_keys, tgt_keys, qids.tolist())):
+            w.writerow([s, t, int_to_qid(q)] + ([] if cos is None else [f"{cos[i]:.6f}"]))
+
+
+# ── main ---------------------------------------------------------------------
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--tsv", action="append", required=True, metavar="LANG=PATH",
+                   help="labels / descriptions TSV of one language (repeatable)")
+    p.add_argument("--model", action="append", default=[], metavar="LANG-LANG=CKPT:DATA",
+                   help="checkpoint holding these languages, for the cos column (repeatable)")
+    p.add_argument("--key", default="label", choices=["label", "qid"],
+                   help="what the pair files hold: labels (label-keyed checkpoints) or Q-ids")
+    p.add_argument("--srcdir", default="src")
+    p.add_argument("--out", required=True, help="prefix of the table and pair files")
+    a = p.parse_args(argv)
+
+    tsvs = dict(t.split("=", 1) for t in a.tsv)
+    models = {tuple(name.split("-")): tuple(spec.split(":", 1))
+              for name, spec in (m.split("=", 1) for m in a.model)}
+
+    table = QidTable.from_tsvs(tsvs)
+    table.save(a.out)
+    print(f"🗃️  {len(table.qids)} Q-ids over {', '.join(table.langs)} → {a.out}.npz, {a.out}_labels.tsv")
+
+    cache = ModelCache(a.srcdir, capacity=max(2, len(models)))
+    for src, tgt in combinations(table.langs, 2):
+        pos = table.pairs(src, tgt)
+        src_keys, tgt_keys = table.keys(src, pos, a.key), table.keys(tgt, pos, a.key)
+        snaps = models_by_lang(models, cache, (src, tgt)) if models else None
+        cos = pair_cosine(snaps, src, tgt, src_keys, tgt_keys, a.key) if snaps else None
+        path = f"{a.out}_{src}_{tgt}.tsv"
+        write_pair_file(path, src_keys, tgt_keys, table.qids[pos], cos)
+        extra = ""
+        if cos is not None and np.isfinite(cos).any():
+            extra = f", mean cos {np.nanmean(cos):.4f} over {int(np.isfinite(cos).sum())} embedded pairs"
+        print(f"✅ wrote {path} ({len(pos)} pairs{extra})")
+
+
+if __name__ == "__main__":
+    main()
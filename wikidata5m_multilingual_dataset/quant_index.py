@@ -0,0 +1,257 @@
+"""
+quant_index.py
+──────────────────────────────────────────────────────
+Compressed entity-embedding indexes for approximate cosine / kNN.
+
+    Int8Index  unit rows quantised to int8 with one float32 scale per row
+               (≈ 4× smaller than float32)
+    PQIndex    product quantisation: d dims split into m sub-spaces, each
+               coded by one byte against a 256-centroid k-means codebook
+               (d·4 / m × smaller)
+
+`knn.topk` scores both tile by tile in their own code domain
+(`prepare` / `tile_scores`): Int8Index as int8 query codes × int8 row codes,
+rescaled once per score; PQIndex through per-query lookup tables of
+sub-vector · centroid products (asymmetric distance computation), summed
+over the m code bytes. `search` takes the approximate top `rerank`
+candidates and re-ranks them exactly against the float32 vectors.
+
+The gain is memory, not scan speed: in NumPy the float32 scan is one BLAS
+GEMM, which the int8 products (also run through GEMM) only match, and
+lookup-table scoring is one gather per code byte, which beats decoding the
+tiles only for small query batches (LUT_MAX_QUERIES; larger PQ batches are
+decoded with one gather and multiplied). The float32 table is only read for re-ranking, so it can stay
+memory-mapped on disk while the codes stay resident.
+
+`report` prints recall@k against exact search, index memory, latency and
+the speed relative to exact search:
+
+python quant_index.py --ckpt test-model-m2-no-alignment-wk5m60k-en-de.ckpt \
+                      --data test-multiG-m2-no-alignment-wk5m60k-en-de.bin \
+                      --src en --tgt de --k 10 --rerank 100 --out index_de
+"""
+
+import argparse, time
+
+import numpy as np
+
+from checkpoint_cache import ModelCache, kg_of
+from knn import normalize, topk
+
+LUT_MAX_QUERIES = 12        # PQ: lookup tables up to this query batch, decoded GEMM beyond
+
+
+class Int8Index:
+    """int8 codes + per-row scale of unit-normalised vectors."""
+
+    kind = "int8"
+
+    def __init__(self, codes, scales):
+        self.codes, self.scales = codes, scales
+
+    @classmethod
+    def build(cls, vec):
+        unit = normalize(vec)
+        scales = np.abs(unit).max(axis=1) / 127 + 1e-12
+        codes = np.round(unit / scales[:, None]).astype(np.int8)
+        return cls(codes, scales.astype(np.float32))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, rows):
+        return self.codes[rows].astype(np.float32) * self.scales[rows, None]
+
+    def prepare(self, q):
+        """int8 codes (held as float32) and scales of unit queries."""
+        scale = np.abs(q).max(axis=1) / 127 + 1e-12
+        return np.round(q / scale[:, None]).astype(np.float32), scale.astype(np.float32)
+
+    def tile_scores(self, prep, j, out):
+        """q · rows j… as int8 × int8 dot products, rescaled once per score.
+
+        NumPy's integer matmul has no BLAS kernel (≈ 35× slower), so the
+        int8 operands go through float32 GEMM, which sums them exactly
+        while |sum| < 2²⁴ (d ≤ 1040).
+        """
+        qc, qs = prep
+        rows = slice(j, j + out.shape[1])
+        np.matmul(qc, self.codes[rows].astype(np.float32).T, out=out)
+        out *= self.scales[rows]
+        out *= qs[:, None]
+        return out
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes
+
+    def save(self, path):
+        np.savez(path, kind=self.kind, codes=self.codes, scales=self.scales)
+
+
+def default_pq_m(d, most=16):
+    """Largest divisor of dim `d` that is at most `most` (10 for the dim-50 checkpoints)."""
+    return max(m for m in range(1, min(d, most) + 1) if d % m == 0)
+
+
+class PQIndex:
+    """m byte codes per row against per-sub-space k-means codebooks."""
+
+    kind = "pq"
+
+    def __init__(self, codes, centroids):
+        self.codes, self.centroids = codes, centroids          # [N, m] uint8, [m, ksub, d/m]
+
+    @classmethod
+    def build(cls, vec, m=None, ksub=256, iters=15, sample=65536, seed=0):
+        unit = normalize(vec)
+        n, d = unit.shape
+        m = m or default_pq_m(d)
+        if d % m:
+            raise ValueError(f"dim {d} not divisible by m={m}")
+        ksub = min(ksub, n)
+        rng = np.random.default_rng(seed)
+        train = unit[rng.choice(n, min(n, sample), replace=False)]
+        sub = d // m
+        centroids = np.empty((m, ksub, sub), dtype=np.float32)
+        codes = np.empty((n, m), dtype=np.uint8)
+        for j in range(m):
+            x = train[:, j * sub:(j + 1) * sub]
+            c = x[rng.choice(len(x), ksub, replace=False)].copy()
+            for _ in range(iters):                                 # Lloyd's k-means
+                assign = _nearest(x, c)
+                counts = np.bincount(assign, minlength=ksub)
+                sums = np.zeros_like(c)
+                np.add.at(sums, assign, x)
+                nonempty = counts > 0
+                c[nonempty] = sums[nonempty] / counts[nonempty, None]
+            centroids[j] = c
+            codes[:, j] = _nearest(unit[:, j * sub:(j + 1) * sub], c)
+        return cls(codes, centroids)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, rows):
+        codes = self.codes[rows]
+        m, ksub, sub = self.centroids.shape
+        flat = self.centroids.reshape(m * ksub, sub)              # one gather for all sub-spaces
+        return flat[codes + np.arange(0, m * ksub, ksub)].reshape(len(codes), m * sub)
+
+    def prepare(self, q):
+        """lookup tables [m, nq, ksub] of q's sub-vectors · every centroid, or
+        None for batches where decoding the tiles and one GEMM is faster."""
+        if len(q) > LUT_MAX_QUERIES:
+            return None
+        m, _, sub = self.centroids.shape
+        lut = np.einsum("nmd,mkd->mnk", q.reshape(len(q), m, sub), self.centroids)
+        return np.ascontiguousarray(lut, dtype=np.float32)
+
+    def tile_scores(self, lut, j, out):
+        """q · decoded rows j…, summed from the lookup tables code byte by code byte."""
+        codes = self.codes[j:j + out.shape[1]]
+        np.take(lut[0], codes[:, 0], axis=1, out=out)
+        for s in range(1, len(lut)):
+            out += np.take(lut[s], codes[:, s], axis=1)
+        return out
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.centroids.nbytes
+
+    def save(self, path):
+        np.savez(path, kind=self.kind, codes=self.codes, centroids=self.centroids)
+
+
+def _nearest(x, c, block=65536):
+    """index of the nearest centroid (L2) for every row of x."""
+    cc = (c * c).sum(axis=1)
+    return np.concatenate([np.argmin(cc - 2 * x[i:i + block] @ c.T, axis=1)
+                           for i in range(0, len(x), block)]).astype(np.int64)
+
+
+def load_index(path):
+    with np.load(path) as z:
+        if str(z["kind"]) == "int8":
+            return Int8Index(z["codes"], z["scales"])
+        return PQIndex(z["codes"], z["centroids"])
+
+
+def search(index, q, k=10, rerank=100, exact=None, **kw):
+    """Approximate top-k of unit queries `q`; exact re-rank of the top `rerank`
+    candidates when the float32 table `exact` is given."""
+    s, i = topk(q, index, max(k, rerank) if exact is not None else k, **kw)
+    if exact is None:
+        return s, i
+    uniq = np.unique(i)                                            # one sorted gather per batch
+    cand = normalize(exact[uniq])
+    s = np.einsum("nd,nkd->nk", q, cand[np.searchsorted(uniq, i)])
+    order = np.argsort(-s, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(s, order, 1), np.take_along_axis(i, order, 1)
+
+
+def recall_at_k(approx, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(a[:k]) & set(t)) / k for a, t in zip(approx.tolist(), truth.tolist())]))
+
+
+def _timed(f, repeat):
+    """(result, best wall time in ms) of `repeat` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = f()
+        best = min(best, (time.perf_counter() - t) * 1e3)
+    return out, best
+
+
+def report(vec_q, vec_x, k=10, rerank=100, pq_m=None, sample=1000, seed=0, indexes=None, repeat=3):
+    """recall@k / memory / latency / speed vs exact of exact, int8 and PQ search; rows of a table."""
+    rng = np.random.default_rng(seed)
+    q = normalize(vec_q[rng.choice(len(vec_q), min(sample, len(vec_q)), replace=False)])
+    x = normalize(vec_x)
+
+    (_, truth), exact_ms = _timed(lambda: topk(q, x, k), repeat)
+    rows = [("exact float32", x.nbytes, 1.0, exact_ms, 1.0)]
+
+    indexes = indexes or [Int8Index.build(vec_x), PQIndex.build(vec_x, m=pq_m)]
+    for index in indexes:
+        for rr in (None, rerank):
+            (_, got), ms = _timed(lambda: search(index, q, k, rr or k, exact=vec_x if rr else None), repeat)
+            name = f"{index.kind}" + (f" + rerank@{rr}" if rr else "")
+            rows.append((name, index.nbytes, recall_at_k(got, truth), ms, exact_ms / ms))
+    return rows
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--ckpt", required=True)
+    p.add_argument("--data", required=True)
+    p.add_argument("--src", required=True, choices=["en", "de", "ru"], help="query language")
+    p.add_argument("--tgt", required=True, choices=["en", "de", "ru"], help="indexed language")
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--rerank", type=int, default=100)
+    p.add_argument("--pq-m", type=int, default=None,
+                   help="PQ sub-spaces (must divide dim; default: largest divisor of dim <= 16)")
+    p.add_argument("--sample", type=int, default=1000, help="queries used for the report")
+    p.add_argument("--srcdir", default="src")
+    p.add_argument("--out", help="prefix: writes <out>_int8.npz and <out>_pq.npz")
+    a = p.parse_args(argv)
+
+    snap = ModelCache(a.srcdir).get(a.ckpt, a.data)
+    vec_x = snap.vec_e[kg_of(a.tgt)]
+    indexes = [Int8Index.build(vec_x), PQIndex.build(vec_x, m=a.pq_m)]
+    if a.out:
+        for index in indexes:
+            index.save(f"{a.out}_{index.kind}.npz")
+            print(f"💾 {a.out}_{index.kind}.npz")
+
+    rows = report(snap.vec_e[kg_of(a.src)], vec_x, a.k, a.rerank, a.pq_m, a.sample, indexes=indexes)
+    print(f"{'index':<22}{'MiB':>9}{'recall@' + str(a.k):>11}{'ms':>10}{'× exact':>9}"
+          f"   ({min(a.sample, len(snap.vec_e[kg_of(a.src)]))} queries)")
+    for name, nbytes, rec, ms, speed in rows:
+        print(f"{name:<22}{nbytes / 2**20:>9.2f}{rec:>11.3f}{ms:>10.1f}{speed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+relation_report.py
+──────────────────────────────────────────────────────
+Streaming per-relation summary of scored triple files (`append_cosine.py`
+output), in constant memory per relation:
+
+    source  relation  label  count  nan  nan_rate  mean  std  min
+    p05  p25  p50  p75  p95  max  digest
+
+Mean/variance are Welford accumulators and quantiles come from a merging
+t-digest, so summaries of several files or languages merge without
+re-reading the triples (count/mean/var up to the written precision,
+quantiles with t-digest accuracy). Inputs can be scored
+TSVs or earlier summaries; relations are keyed by relation id, which is the
+same in every language. Rows of 3-column files only name the relation by
+label; those strata are folded into the id of that label wherever an
+id-keyed row or summary of the run has shown it.
+
+python relation_report.py triples_42K_en_with_cos_desc.tsv \
+                          triples_42K_de_with_cos_desc.tsv \
+                          triples_42K_ru_with_cos_desc.tsv \
+                          --source en de ru --out relation_report_42k.tsv
+
+python relation_report.py relation_report_42k.tsv --pool --out relation_report_all.tsv
+"""
+
+import argparse, csv, math
+from pathlib import Path
+
+import numpy as np
+
+from triple_io import iter_chunks
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+COLUMNS = (["source", "relation", "label", "count", "nan", "nan_rate", "mean", "std", "min"]
+           + [f"p{int(q * 100):02d}" for q in QUANTILES] + ["max", "digest"])
+
+
+# ── t-digest ------------------------------------------------------------------
+class TDigest:
+    """Merging t-digest (Dunning & Ertl) with the k1 scale function."""
+
+    def __init__(self, delta=100, means=(), weights=()):
+        self.delta = delta
+        self.means = np.asarray(means, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self._buf = []
+
+    @property
+    def count(self):
+        self._flush()
+        return float(self.weights.sum())
+
+    def update(self, values):
+        self._buf.append(np.asarray(values, dtype=np.float64))
+        if sum(len(b) for b in self._buf) > 20 * self.delta:
+            self._flush()
+
+    def merge(self, other):
+        other._flush()
+        self._buf.append(other.means)
+        self._flush(extra_w=other.weights)
+        return self
+
+    def _flush(self, extra_w=None):
+        if not self._buf:
+            return
+        vals = self._buf
+        wts = [np.ones(len(b)) for b in self._buf]
+        if extra_w is not None:                        # last buffer holds weighted centroids
+            wts[-1] = extra_w
+        self._buf = []
+        means = np.concatenate([self.means] + vals)
+        weights = np.concatenate([self.weights] + wts)
+        self.means, self.weights = self._compress(means, weights)
+
+    def _compress(self, means, weights):
+        if not len(means):
+            return means, weights
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        k = lambda q: self.delta / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+        out_m, out_w = [means[0]], [weights[0]]
+        done = 0.0                                     # weight left of the current centroid
+        k_lo = k(0.0)
+        for m, w in zip(means[1:].tolist(), weights[1:].tolist()):
+            if k((done + out_w[-1] + w) / total) - k_lo <= 1:
+                out_w[-1] += w
+                out_m[-1] += (m - out_m[-1]) * w / out_w[-1]
+            else:
+                done += out_w[-1]
+                k_lo = k(done / total)
+                out_m.append(m)
+                out_w.append(w)
+        return np.array(out_m), np.array(out_w)
+
+    def quantile(self, q):
+        self._flush()
+        if not len(self.means):
+            return math.nan
+        if len(self.means) == 1:
+            return float(self.means[0])
+        # centroid i covers the cumulative weight around its centre
+        centres = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * self.weights.sum(), centres, self.means))
+
+    def dumps(self):
+        self._flush()
+        return ";".join(f"{m:.6g}:{w:g}" for m, w in zip(self.means.tolist(), self.weights.tolist()))
+
+    @classmethod
+    def loads(cls, text, delta=100):
+        if not text:
+            return cls(delta)
+        pairs = [p.split(":") for p in text.split(";")]
+        return cls(delta, [float(m) for m, _ in pairs], [float(w) for _, w in pairs])
+
+
+# ── per-relation accumulator ---------------------------------------------------
+class RelStats:
+    """count / NaN count / Welford mean+M2 / min / max / t-digest of one relation."""
+
+    def __init__(self, label=""):
+        self.label = label
+        self.n = self.nan = 0
+        self.mean = self.m2 = 0.0
+        self.min, self.max = math.inf, -math.inf
+        self.digest = TDigest()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        isnan = np.isnan(values)
+        self.nan += int(isnan.sum())
+        values = values[~isnan]
+        if len(values):
+            self._combine(len(values), float(values.mean()), float(((values - values.mean()) ** 2).sum()),
+                          float(values.min()), float(values.max()))
+            self.digest.update(values)
+
+    def _combine(self, n, mean, m2, lo, hi):
+        # Chan et al. parallel variance update
+        total = self.n + n
+        d = mean - self.mean
+        self.mean += d * n / total
+        self.m2 += m2 + d * d * self.n * n / total
+        self.n = total
+        self.min, self.max = min(self.min, lo), max(self.max, hi)
+
+    def merge(self, other):
+        self.label = self.label or other.label
+        self.nan += other.nan
+        if other.n:
+            self._combine(other.n, other.mean, other.m2, other.min, other.max)
+        self.digest.merge(other.digest)
+        return self
+
+    def row(self, source, relation):
+        seen = self.n + self.nan
+        std = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+        num = lambda x: f"{x:.6f}" if self.n and math.isfinite(x) else "NaN"
+        return ([source, relation, self.label, self.n + self.nan, self.nan,
+                 f"{self.nan / seen:.4f}" if seen else "NaN", num(self.mean), num(std), num(self.min)]
+                + [num(self.digest.quantile(q)) for q in QUANTILES]
+                + [num(self.max), self.digest.dumps()])
+
+    @classmethod
+    def from_row(cls, rec):
+        st = cls(rec["label"])
+        st.nan = int(rec["nan"])
+        st.n = int(rec["count"]) - st.nan
+        if st.n:
+            st.mean = float(rec["mean"])
+            std = float(rec["std"])
+            st.m2 = std * std * (st.n - 1) if st.n > 1 else 0.0
+            st.min, st.max = float(rec["min"]), float(rec["max"])
+        st.digest = TDigest.loads(rec["digest"])
+        return st
+
+
+# ── readers --------------------------------------------------------------------
+def _score(cell):
+    try:
+        return float(cell)
+    except ValueError:
+        return math.nan
+
+
+def scan_scored(path, stats, score_col=-1, rel_col=None, label_col=None, chunk=65536, ids=None):
+    """Fold one scored TSV into `stats` (relation → RelStats).
+
+    3/4-column rows only carry the relation label; the id-keyed rows teach
+    `ids` (relation label → id, shared across calls if passed), and
+    label-keyed strata whose label is known are folded into the id stratum.
+    """
+    ids = {} if ids is None else ids
+    with Path(path).open(encoding="utf-8") as fin:
+        rdr = csv.reader(fin, delimiter="\t")
+        for rows in iter_chunks(rdr, chunk):
+            rows = [r for r in rows if len(r) >= 4 and r[:2] != ["subject_id", "subject_label"]]
+            if not rows:
+                continue
+            # scored labels/descriptions rows have ≥ 7 columns: id-keyed relation at 2, label at 3
+            rels = [r[rel_col if rel_col is not None else (2 if len(r) >= 7 else 1)] for r in rows]
+            if rel_col is None:
+                ids.update((r[3], r[2]) for r in rows if len(r) >= 7)
+            scores = np.fromiter((_score(r[score_col]) for r in rows), dtype=np.float64, count=len(rows))
+            keys, inv = np.unique(rels, return_inverse=True)
+            order = np.argsort(inv, kind="stable")
+            bounds = np.searchsorted(inv[order], np.arange(len(keys) + 1))
+            for g, rel in enumerate(keys.tolist()):
+                sel = order[bounds[g]:bounds[g + 1]]
+                if rel not in stats:
+                    r0 = rows[sel[0]]
+                    lc = label_col if label_col is not None else (3 if len(r0) >= 7 else None)
+                    stats[rel] = RelStats(r0[lc] if lc is not None else "")
+                stats[rel].update(scores[sel])
+    return rekey(stats, ids)
+
+
+def rekey(stats, ids):
+    """Merge strata keyed by a relation label into the stratum of its id, in place."""
+    for label, rel in ids.items():
+        if label != rel and label in stats:
+            st = stats.pop(label)
+            st.label = st.label or label
+            merge_into(stats, {rel: st})
+    return stats
+
+
+def read_summary(path):
+    """{source: {relation: RelStats}} of a summary TSV written by this script."""
+    out = {}
+    with Path(path).open(encoding="utf-8") as fin:
+        for rec in csv.DictReader(fin, delimiter="\t"):
+            out.setdefault(rec["source"], {})[rec["relation"]] = RelStats.from_row(rec)
+    return out
+
+
+def is_summary(path):
+    with Path(path).open(encoding="utf-8") as fin:
+        return fin.readline().startswith("source\trelation\t")
+
+
+def merge_into(dst, src):
+    for rel, st in src.items():
+        if rel in dst:
+            dst[rel].merge(st)
+        else:
+            dst[rel] = st
+    return dst
+
+
+def write_summary(path, by_source):
+    with Path(path).open("w", encoding="utf-8", newline="") as fout:
+        w = csv.writer(fout, delimiter="\t")
+        w.writerow(COLUMNS)
+        for source in sorted(by_source):
+            stats = by_source[source]
+            for rel in sorted(stats, key=lambda r: -(stats[r].n + stats[r].nan)):
+                w.writerow(stats[rel].row(source, rel))
+
+
+# ── main ---------------------------------------------------------------------
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("inputs", nargs="+", help="scored triple TSVs and/or earlier summaries")
+    p.add_argument("--out", required=True)
+    p.add_argument("--source", nargs="*", help="source name per input (default: file stem)")
+    p.add_argument("--pool", action="store_true", help="merge all sources into one 'all' source")
+    p.add_argument("--score-col", type=int, default=-1, help="score column (default: last)")
+    p.add_argument("--rel-col", type=int, default=None,
+                   help="relation column (default: relation id, 2, or 1 for 3-column files)")
+    p.add_argument("--chunk", type=int, default=65536)
+    a = p.parse_args(argv)
+    if a.source and len(a.source) != len(a.inputs):
+        p.error("--source needs one name per input")
+
+    by_source, ids = {}, {}                          # ids: relation label → id, over all inputs
+    for i, path in enumerate(a.inputs):
+        if is_summary(path):                           # keeps its own source names
+            parts = read_summary(path)
+            ids.update((st.label, rel) for stats in parts.values() for rel, st in stats.items()
+                       if st.label and st.label != rel)
+        else:
+            name = a.source[i] if a.source else Path(path).stem
+            parts = {name: scan_scored(path, {}, a.score_col, a.rel_col, chunk=a.chunk, ids=ids)}
+        for source, stats in parts.items():
+            merge_into(by_source.setdefault("all" if a.pool else source, {}), stats)
+        print(f"📊 {path}: {sum(len(s) for s in parts.values())} relations")
+    for stats in by_source.values():                   # label-only inputs read before their ids
+        rekey(stats, ids)
+
+    write_summary(a.out, by_source)
+    print(f"✅ wrote {a.out} ({len(by_source)} source(s))")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+scoring.py
+──────────────────────────────────────────────────────
+Vectorised triple metrics over whole index arrays, shared by
+`append_cosine.py` and `embedding_server.py`.
+
+    cos     cosine(h, t)
+    transe  ||h + r − t||, L1 or L2 as the checkpoint was trained (multiG.L1)
+    l1      ||h + r − t||_1
+    l2      ||h + r − t||_2
+"""
+
+import numpy as np
+
+METRICS = ["cos", "transe", "l1", "l2"]
+REL_METRICS = {"transe", "l1", "l2"}           # need the relation vectors
+
+
+def row_norms(vec: np.ndarray):
+    """L2 norms of every entity row, computed once per run."""
+    return np.linalg.norm(vec, axis=1)
+
+def batch_cosine(vec: np.ndarray, norms: np.ndarray, s_idx: np.ndarray, o_idx: np.ndarray):
+    """Row-wise cosine(vec[s], vec[o]) for whole index arrays (same +1e-8 guard as before)."""
+    dots = np.einsum("ij,ij->i", vec[s_idx], vec[o_idx])
+    return dots / (norms[s_idx] * norms[o_idx] + 1e-8)
+
+def batch_transe(vec: np.ndarray, rvec: np.ndarray, s_idx, r_idx, o_idx, L1: bool):
+    """Row-wise TransE distance ||vec[s] + rvec[r] − vec[o]|| (L1 or L2)."""
+    d = vec[s_idx] + rvec[r_idx] - vec[o_idx]
+    return np.abs(d).sum(axis=1) if L1 else np.sqrt(np.einsum("ij,ij->i", d, d))
+
+def score(metric, vec, norms, rvec, L1, s_idx, o_idx, r_idx=None):
+    """One metric column; `L1` is the checkpoint's flag (used by "transe")."""
+    if metric == "cos":
+        return batch_cosine(vec, norms, s_idx, o_idx)
+    return batch_transe(vec, rvec, s_idx, r_idx, o_idx, L1 if metric == "transe" else metric == "l1")
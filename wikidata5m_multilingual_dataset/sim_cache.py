@@ -0,0 +1,163 @@
+"""
+sim_cache.py
+──────────────────────────────────────────────────────
+On-disk cache of subject/object similarity scores.
+
+Scores are keyed by (checkpoint fingerprint, language, subject index,
+object index), so re-running `append_cosine.py` over the labels and
+descriptions variants, or over the 42k and 60k files, only scores the
+pairs it has not seen before. Scores computed during a run are looked up
+by its later chunks straight away and written to disk once, by `save()`.
+The entity label table of each checkpoint
+is cached too: a run whose pairs are all cached never rebuilds the Tester.
+
+Layout under the cache root:
+
+    manifest.json                     ckpt path → fingerprint + file stats
+    <fingerprint>/labels_<lang>.txt   entity labels of the language's KG
+    <fingerprint>/<metric>_<lang>.npz sorted int64 pair keys + float64 scores
+
+The fingerprint is a SHA-1 over the checkpoint files (`<ckpt>`,
+`<ckpt>.index`, `<ckpt>.data-*`, `<ckpt>.meta`) and the multiG data file.
+It is only re-hashed when a file's size or mtime changes; when it differs
+from the one recorded for that checkpoint path, the stale directory is
+removed.
+"""
+
+import hashlib, json, os, shutil
+from pathlib import Path
+
+import numpy as np
+
+
+# ── checkpoint fingerprint --------------------------------------------------
+def checkpoint_files(ckpt, data):
+    ckpt = Path(ckpt)
+    files = [p for p in ckpt.parent.glob(ckpt.name + "*")
+             if p.is_file() and (p.name == ckpt.name or p.name.startswith(ckpt.name + "."))]
+    return sorted(files) + [Path(data)]
+
+
+def _stats(files):
+    return [[str(p), p.stat().st_size, p.stat().st_mtime_ns] for p in files]
+
+
+def _hash_files(files, block=1 << 20):
+    h = hashlib.sha1()
+    for p in files:
+        h.update(p.name.encode())
+        with open(p, "rb") as f:
+            for buf in iter(lambda: f.read(block), b""):
+                h.update(buf)
+    return h.hexdigest()
+
+
+def pair_keys(s_idx, o_idx):
+    """(subject, object) row indices → one int64 key per pair."""
+    return (np.asarray(s_idx, dtype=np.int64) << 32) | np.asarray(o_idx, dtype=np.int64)
+
+
+# ── cache ------------------------------------------------------------------------
+class SimCache:
+    """Pair-score cache for one checkpoint; see module docstring."""
+
+    def __init__(self, root, ckpt, data):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = self._fingerprint(ckpt, data)
+        self.dir = self.root / self.fingerprint[:16]
+        self.dir.mkdir(exist_ok=True)
+        self._tables = {}                 # (metric, lang) → (keys, vals)
+        self._fresh = {}                  # (metric, lang) → sorted (keys, vals) scored this run
+        self.hits = self.lookups = 0
+
+    def _fingerprint(self, ckpt, data):
+        manifest_p = self.root / "manifest.json"
+        manifest = json.loads(manifest_p.read_text()) if manifest_p.exists() else {}
+        files = checkpoint_files(ckpt, data)
+        stats = _stats(files)
+        entry = manifest.get(str(ckpt))
+        if entry and entry["files"] == stats:
+            return entry["fingerprint"]
+
+        fp = _hash_files(files)
+        if entry and entry["fingerprint"] != fp:
+            shutil.rmtree(self.root / entry["fingerprint"][:16], ignore_errors=True)
+            print(f"♻️  {ckpt} changed; dropped its cached scores")
+        manifest[str(ckpt)] = {"fingerprint": fp, "files": stats}
+        tmp = manifest_p.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, indent=1))
+        os.replace(tmp, manifest_p)
+        return fp
+
+    # ── entity labels --
+    def labels(self, lang):
+        """Cached label table of `lang`'s KG, or None."""
+        p = self.dir / f"labels_{lang}.txt"
+        if not p.exists():
+            return None
+        with open(p, encoding="utf-8") as f:
+            return [lbl or None for lbl in f.read().split("\n")]
+
+    def save_labels(self, lang, labels):
+        p = self.dir / f"labels_{lang}.txt"
+        tmp = p.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lbl or "" for lbl in labels))
+        os.replace(tmp, p)
+
+    # ── scores --
+    def _path(self, metric, lang):
+        return self.dir / f"{metric}_{lang}.npz"
+
+    def _table(self, metric, lang):
+        if (metric, lang) not in self._tables:
+            p = self._path(metric, lang)
+            if p.exists():
+                with np.load(p) as z:
+                    self._tables[metric, lang] = (z["keys"], z["vals"])
+            else:
+                self._tables[metric, lang] = (np.zeros(0, np.int64), np.zeros(0, np.float64))
+        return self._tables[metric, lang]
+
+    def lookup(self, metric, lang, s_idx, o_idx):
+        """Cached scores of the pairs → (float64 scores, hit-mask); NaN where missed.
+
+        Scores `add`ed earlier in this run count as cached too.
+        """
+        q = pair_keys(s_idx, o_idx)
+        out = np.full(len(q), np.nan)
+        hit = np.zeros(len(q), dtype=bool)
+        for keys, vals in (self._table(metric, lang), self._fresh.get((metric, lang), (None, None))):
+            if keys is None or not len(keys):
+                continue
+            pos = np.minimum(np.searchsorted(keys, q), len(keys) - 1)
+            found = ~hit & (keys[pos] == q)
+            out[found] = vals[pos[found]]
+            hit |= found
+        self.lookups += len(q)
+        self.hits += int(np.count_nonzero(hit))
+        return out, hit
+
+    def add(self, metric, lang, s_idx, o_idx, vals):
+        """Newly computed scores: visible to `lookup` at once, written to disk on `save()`."""
+        keys, vals = pair_keys(s_idx, o_idx), np.asarray(vals, dtype=np.float64)
+        old_k, old_v = self._fresh.get((metric, lang), (np.zeros(0, np.int64), np.zeros(0, np.float64)))
+        keys, first = np.unique(np.concatenate([old_k, keys]), return_index=True)
+        self._fresh[metric, lang] = (keys, np.concatenate([old_v, vals])[first])
+
+    def save(self):
+        for (metric, lang), (new_k, new_v) in self._fresh.items():
+            old_k, old_v = self._table(metric, lang)
+            keys, first = np.unique(np.concatenate([old_k, new_k]), return_index=True)
+            vals = np.concatenate([old_v, new_v])[first]      # sorted, one score per pair
+            p = self._path(metric, lang)
+            tmp = p.with_name(p.stem + ".tmp.npz")
+            np.savez(tmp, keys=keys, vals=vals)
+            os.replace(tmp, p)
+            self._tables[metric, lang] = (keys, vals)
+        self._fresh.clear()
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
@@ -0,0 +1,190 @@
+"""
+stratified_sample.py
+──────────────────────────────────────────────────────
+Reproducible relation-stratified subsample of the extraction outputs, for
+plotting sets too large to project whole.
+
+A "first N rows" slice is biased toward whichever relations come first in
+the triple file. Here every (language, relation) stratum keeps a uniform
+random sample of up to --per-relation triples, drawn in one streaming pass
+over each triple TSV with per-stratum reservoirs (Li's Algorithm L: each row
+costs one counter increment and compare; random numbers are only drawn
+when a row enters a reservoir). Triples mentioning a --highlight label are
+always kept, the first one per label and role.
+
+Relations are keyed by relation id (the same in every language). Triple
+rows are mapped to rows of the extraction outputs of each role:
+
+    dedup format  through `<role>_index_<p>.npy` (-1 = no embedding)
+    rows format   by walking `<role>_labels_<p>.txt` in lockstep with the
+                  triples (only rows with an embedding were written)
+
+The sample is saved as one .npz, per prefix:
+
+    <p>_triples    int64  sorted triple rows (0-based, header excluded)
+    <p>_subject    int64  rows of load_role(<dir>, "subject", <p>)
+    <p>_object     int64  rows of load_role(<dir>, "object", <p>)
+
+plus the parameters, so `visualize.py --sample` redraws exactly the same
+points.
+
+python stratified_sample.py --triples en=wikidata5m_top200_en_60k_labels.tsv \
+                            --triples de=wikidata5m_top200_de_60k_labels.tsv \
+                            --emb-dir subj_obj_embeddings --per-relation 200 \
+                            --highlight "Berlin" --out sample_en_de.npz
+"""
+
+import argparse, json, math, time
+from pathlib import Path
+
+import numpy as np
+
+from entity_ids import relation_key, triple_keys
+from entity_store import dedup_paths
+from label_lookup import LabelIndex
+from triple_io import triple_reader
+
+ROLES = ["subject", "object"]
+
+
+# ── per-stratum reservoir ----------------------------------------------------
+class Reservoir:
+    """Uniform sample of at most k items of a stream (Algorithm L)."""
+
+    def __init__(self, k, rng):
+        self.k, self.rng = k, rng
+        self.items = []
+        self.seen = 0
+        self._w = math.exp(math.log(1.0 - rng.random()) / k) if k else 0.0
+        self._next = k + self._skip() if k else math.inf
+
+    def _skip(self):
+        return int(math.log(1.0 - self.rng.random()) / math.log1p(-self._w)) + 1 if self._w < 1 else 1
+
+    def add(self, item):
+        if self.seen < self.k:
+            self.items.append(item)
+        elif self.seen + 1 == self._next:
+            self.items[int(self.rng.integers(self.k))] = item
+            self._w *= math.exp(math.log(1.0 - self.rng.random()) / self.k)
+            self._next += self._skip()
+        self.seen += 1
+
+
+# ── triple rows → extraction rows ---------------------------------------------
+class RoleRows:
+    """Which triple rows of one role have an embedding, filled during the pass."""
+
+    def __init__(self, emb_dir, role, prefix):
+        _, _, idx_p = dedup_paths(emb_dir, role, prefix)
+        self.index = np.load(idx_p) if idx_p.exists() else None
+        self.labels, self.pos = None, 0
+        if self.index is None:
+            with open(Path(emb_dir) / f"{role}_labels_{prefix}.txt", encoding="utf-8") as f:
+                self.labels = [line.strip() for line in f]
+        self.found = []
+
+    def step(self, label):
+        if self.index is not None:
+            return
+        hit = self.pos < len(self.labels) and self.labels[self.pos] == label.strip()
+        self.pos += hit
+        self.found.append(hit)
+
+    def rows(self, triples):
+        """extraction rows of the given triple rows (those with an embedding only)."""
+        found = self.index >= 0 if self.index is not None else np.array(self.found, dtype=bool)
+        row = np.cumsum(found) - 1
+        return row[triples[found[triples]]].astype(np.int64)
+
+
+def sample_prefix(triples, emb_dir, prefix, per_relation, seed=0, highlights=()):
+    """One pass over a triple TSV → (sorted triple rows, {role: extraction rows}, #strata).
+
+    The generator is seeded per call, so prefixes extracted from the same
+    triple file (en / en2) get the same triples.
+    """
+    rng = np.random.default_rng(seed)
+    strata = {}
+    roles = {role: RoleRows(emb_dir, role, prefix) for role in ROLES}
+    wanted = LabelIndex(highlights) if highlights else None
+    pinned = {}                                          # (role, highlight) → first triple row
+    seen = {}                                            # label → highlight number, -1 if none
+    with Path(triples).open(encoding="utf-8") as fin:
+        rdr, _ = triple_reader(fin)
+        for i, row in enumerate(rdr):
+            labels = triple_keys(row)
+            for role, lbl in zip(ROLES, labels):
+                roles[role].step(lbl)
+            rel = relation_key(row, "qid")
+            res = strata.get(rel)
+            if res is None:
+                res = strata[rel] = Reservoir(per_relation, rng)
+            res.add(i)
+            if wanted is not None:
+                for role, lbl in zip(ROLES, labels):
+                    h = seen.get(lbl)
+                    if h is None:
+                        h = seen[lbl] = wanted.lookup(lbl)
+                    if h >= 0:
+                        pinned.setdefault((role, h), i)
+
+    for role, r in roles.items():
+        if r.labels is not None and r.pos != len(r.labels):
+            raise ValueError(f"{triples} does not line up with {role}_labels_{prefix}.txt "
+                             f"({r.pos} of {len(r.labels)} labels matched)")
+    picked = [i for res in strata.values() for i in res.items] + list(pinned.values())
+    rows = np.unique(np.asarray(picked, dtype=np.int64))
+    return rows, {role: r.rows(rows) for role, r in roles.items()}, len(strata)
+
+
+def save_sample(path, samples, **params):
+    arrays = {}
+    for prefix, (rows, by_role) in samples.items():
+        arrays[f"{prefix}_triples"] = rows
+        arrays.update({f"{prefix}_{role}": r for role, r in by_role.items()})
+    np.savez(path, params=json.dumps(params), **arrays)
+
+
+def load_sample(path):
+    """{"<prefix>_<role>": extraction rows, ...} and the parameters of a saved sample."""
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files if k != "params"}, json.loads(str(z["params"]))
+
+
+# ── main ---------------------------------------------------------------------
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--triples", action="append", required=True, metavar="PREFIX=PATH",
+                   help="triple TSV the extraction outputs of PREFIX were built from (repeatable)")
+    p.add_argument("--emb-dir", default="subj_obj_embeddings")
+    p.add_argument("--per-relation", type=int, default=200, help="triples kept per (language, relation)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--highlight", action="append", default=[], metavar="LABEL",
+                   help="entity label always kept in the sample (repeatable)")
+    p.add_argument("--highlight-file", help="file with one label to keep per line")
+    p.add_argument("--out", required=True, help="sample .npz for visualize.py --sample")
+    a = p.parse_args(argv)
+
+    highlights = list(a.highlight)
+    if a.highlight_file:
+        with open(a.highlight_file, encoding="utf-8") as f:
+            highlights += [line.rstrip("\n") for line in f if line.strip()]
+
+    samples = {}
+    for prefix, path in (t.split("=", 1) for t in a.triples):
+        t0 = time.perf_counter()
+        rows, by_role, n_strata = sample_prefix(path, a.emb_dir, prefix, a.per_relation, a.seed,
+                                                highlights)
+        samples[prefix] = rows, by_role
+        print(f"📦 {prefix}: {len(rows)} triples from {n_strata} relations "
+              f"({len(by_role['subject'])} subject / {len(by_role['object'])} object rows) "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+    save_sample(a.out, samples, triples=a.triples, emb_dir=a.emb_dir, per_relation=a.per_relation,
+                seed=a.seed, highlights=highlights)
+    print(f"💾 wrote {a.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+triple_io.py
+──────────────────────────────────────────────────────
+Reading the triple TSVs written by `sample_wikidata_triples.py` /
+`sample_42k_from_60k.py` (labels: 6 columns, descriptions: 8 columns,
+plain: 3 columns), with the optional `subject_id  subject_label ...` header.
+
+`line_chunks` / `append_columns` are the bulk path for scripts that copy
+every row and append a few columns (`append_cosine.py`): rows keep their
+raw line, so the output is joined per row instead of re-quoted per field,
+with the same text `csv.writer(delimiter="\t")` would write.
+"""
+
+import csv, gc
+from contextlib import contextmanager
+from itertools import islice
+
+HEADER = ["subject_id", "subject_label"]
+
+
+def triple_reader(fin):
+    """csv rows of an open triple file; returns (rows, header_skipped).
+
+    Blank and short rows (fewer than 3 fields) are skipped like the header.
+    """
+    rdr = csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE)
+    first_row = next(rdr, None)
+    skipped = first_row is not None and first_row[:2] == HEADER
+    if not skipped:
+        fin.seek(0)
+        rdr = csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE)
+    return (row for row in rdr if len(row) >= 3), skipped
+
+
+def iter_chunks(rows, size):
+    """Group an iterable of rows into lists of at most `size` rows."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def line_chunks(fin, size):
+    """`triple_reader` + `iter_chunks` over raw lines → (chunks, header_skipped).
+
+    Every chunk is (lines, rows): up to `size` lines without their newline
+    and the same lines split on tabs, as csv.reader with QUOTE_NONE splits
+    them (a blank line is an empty row).
+    """
+    first = fin.readline()
+    skipped = first.rstrip("\n").split("\t")[:2] == HEADER
+    if not skipped:
+        fin.seek(0)
+
+    def chunks():
+        while True:
+            lines = [line.rstrip("\n") for line in islice(fin, size)]
+            if not lines:
+                return
+            yield lines, [line.split("\t") if line else [] for line in lines]
+    return chunks(), skipped
+
+
+def append_columns(lines, rows, columns):
+    """csv.writer(delimiter="\t") text of every row followed by its cells.
+
+    columns: one list of cell strings per appended column (cells must not
+    need quoting). Rows are joined from their raw line; fields split from a
+    line hold no tab or newline, so a '"' is the only thing csv would quote,
+    and only those rows are re-joined field by field.
+    """
+    out = list(map("\t".join, zip(lines, *columns)))
+    for i, line in enumerate(lines):
+        if not line:                                   # empty row: csv writes the cells only
+            out[i] = "\t".join(c[i] for c in columns)
+        elif '"' in line:
+            out[i] = "\t".join([_quote(f) for f in rows[i]] + [c[i] for c in columns])
+    out.append("")
+    return "\r\n".join(out)
+
+
+def _quote(field):
+    """csv QUOTE_MINIMAL for a tab-free, newline-free field."""
+    return '"' + field.replace('"', '""') + '"' if '"' in field else field
+
+
+@contextmanager
+def no_gc():
+    """Pause the cyclic GC for a bulk row pass.
+
+    A chunk holds ~10⁵ row lists and every allocation-triggered collection
+    rescans all of them (≈ 10× the cost of splitting the lines); the rows
+    form no cycles, so nothing is lost by collecting afterwards.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
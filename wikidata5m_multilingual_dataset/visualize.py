@@ -0,0 +1,194 @@
+"""
+visualize.py
+──────────────────────────────────────────────────────
+2-D map of any number of subject / object embedding sets, with entities
+highlighted by label.
+
+Each --set LANG:ROLE[:COLOUR] is read with `entity_store.load_role` (per-row
+or dedup extraction output), all sets are projected together through
+`projection.project_rows` (distinct vectors only, cached on disk) and drawn
+in their own colour. --highlight takes labels, not row numbers: a label →
+row index is built once per set (`label_lookup.LabelIndex`, exact then
+canonical match) and every set containing the label marks it.
+
+Rendering (--render):
+    scatter   one rasterised dot per row
+    density   per-set 2-D histograms drawn as coloured images, opacity by
+              log count (readable at hundreds of thousands of points)
+    hexbin    one log-scaled hexbin of all points
+    auto      scatter up to --dense-above points, density beyond
+
+--save-map keeps the fitted projection; --map places the sets onto such a
+saved map instead of projecting again (`projection.place`): points already on
+it keep their coordinates, new entities / languages are interpolated from
+their nearest neighbours, so the layout stays stable across runs.
+
+--sample draws only the rows of a `stratified_sample.py` file (the same
+triples per relation and language on every run) instead of whole sets.
+
+Only NumPy / Matplotlib are imported at start-up (no torch / TensorFlow).
+
+python visualize.py --set en:subject --set en:object --set de:subject --set de:object \
+                    --highlight "Albert Einstein" --highlight "Albert Einstein (Physiker)" \
+                    --title "t-SNE of Subject/Object Embeddings (EN + DE)" --out tsne_en_de.png
+"""
+
+import argparse
+
+import numpy as np
+
+from entity_store import load_role
+from label_lookup import LabelIndex
+from projection import DEFAULT_CACHE, METHODS, place_rows, project_rows
+from stratified_sample import load_sample
+
+COLOURS = ["#ffcc80", "#80b3ff", "#ff99cc", "#99ffcc", "#e3b3ff", "#80fdff", "#c2c2f0", "#d9d98c"]
+HIGHLIGHT = ["red", "yellow", "#26B226", "#7B008B", "#B638FF", "#5CF22A", "orange", "cyan"]
+
+
+class EmbeddingSet:
+    def __init__(self, spec, emb_dir, i, rows=None):
+        parts = spec.split(":")
+        self.lang, self.role = parts[0], parts[1] if len(parts) > 1 else "subject"
+        self.colour = parts[2] if len(parts) > 2 else COLOURS[i % len(COLOURS)]
+        self.highlight = HIGHLIGHT[i % len(HIGHLIGHT)]
+        vecs, labels = load_role(emb_dir, self.role, self.lang)
+        if rows is not None:                            # gather the sampled rows only
+            vecs, labels = vecs[rows], [labels[r] for r in rows.tolist()]
+        self.vectors = np.asarray(vecs)
+        self.labels = labels
+        self._index = None
+        self.coords = None
+
+    @property
+    def name(self):
+        return f"{self.lang.upper()} {self.role.capitalize()}s"
+
+    def find(self, label):
+        """first row with this label (exact, then canonical match), or -1."""
+        if self._index is None:
+            self._index = LabelIndex(list(self.labels), first=True)
+        return self._index.lookup(label)
+
+
+def draw_density(ax, sets, bins, extent):
+    (x0, x1), (y0, y1) = extent
+    from matplotlib.colors import to_rgb
+    for s in sets:
+        h, _, _ = np.histogram2d(s.coords[:, 0], s.coords[:, 1], bins=bins, range=extent)
+        alpha = np.log1p(h.T)
+        if alpha.max() > 0:
+            alpha /= alpha.max()
+        img = np.zeros(alpha.shape + (4,), dtype=np.float32)
+        img[..., :3] = to_rgb(s.colour)
+        img[..., 3] = 0.85 * alpha
+        ax.imshow(img, origin="lower", extent=(x0, x1, y0, y1), aspect="auto",
+                  interpolation="nearest", zorder=1)
+
+
+def plot(sets, highlights, render="auto", dense_above=50000, bins=400, title=None, out=None):
+    import matplotlib
+    if out:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 10))
+    all_xy = np.concatenate([s.coords for s in sets])
+    if render == "auto":
+        render = "density" if len(all_xy) > dense_above else "scatter"
+    pad = 0.02 * (all_xy.max(axis=0) - all_xy.min(axis=0))
+    extent = list(zip(all_xy.min(axis=0) - pad, all_xy.max(axis=0) + pad))
+
+    if render == "scatter":
+        for s in sets:
+            ax.scatter(s.coords[:, 0], s.coords[:, 1], c=s.colour, s=10, alpha=0.6, rasterized=True)
+    elif render == "density":
+        draw_density(ax, sets, bins, extent)
+    else:
+        ax.hexbin(all_xy[:, 0], all_xy[:, 1], gridsize=bins // 2, bins="log", mincnt=1,
+                  cmap="Greys", rasterized=True)
+    if render != "hexbin":
+        for s in sets:                                  # dummy scatter for large legend markers
+            ax.scatter([], [], c=s.colour, s=90, label=s.name)
+
+    for label in highlights:
+        for s in sets:
+            row = s.find(label)
+            if row < 0:
+                continue
+            x, y = s.coords[row]
+            ax.scatter(x, y, s=100, edgecolors="black", facecolors=s.highlight, alpha=0.9, zorder=3,
+                       label=f"Highlighted {s.name[:-1]}")
+            ax.text(x + 2, y, s.labels[row], fontsize=9, zorder=4)
+            print(f"📍 {s.name[:-1]} {label!r} → row {row}, coords ({x:.2f}, {y:.2f})")
+
+    ax.set_xlim(*extent[0])
+    ax.set_ylim(*extent[1])
+    if title:
+        ax.set_title(title)
+    ax.set_xlabel("Dimension 1")
+    ax.set_ylabel("Dimension 2")
+    handles, labels = ax.get_legend_handles_labels()
+    by_label = dict(zip(labels, handles))
+    if by_label:
+        ax.legend(by_label.values(), by_label.keys())
+    ax.grid(True)
+    fig.tight_layout()
+    if out:
+        fig.savefig(out, dpi=150)
+        print(f"✅ wrote {out}")
+    else:
+        plt.show()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--set", action="append", required=True, dest="sets", metavar="LANG:ROLE[:COLOUR]",
+                   help="embedding set, e.g. en:subject or ru:object:#e3b3ff (repeatable)")
+    p.add_argument("--emb-dir", default="subj_obj_embeddings")
+    p.add_argument("--highlight", action="append", default=[], metavar="LABEL",
+                   help="entity label to mark in every set that has it (repeatable)")
+    p.add_argument("--highlight-file", help="file with one label to highlight per line")
+    p.add_argument("--sample", help="stratified_sample.py file: plot only its rows of every set")
+    p.add_argument("--method", default="tsne", choices=METHODS)
+    p.add_argument("--perplexity", type=float, default=30)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--cache-dir", default=DEFAULT_CACHE, help="projection cache ('' disables)")
+    p.add_argument("--save-map", help="save the fitted projection (.npz) for later --map runs")
+    p.add_argument("--map", help="place the sets onto this saved projection instead of fitting one")
+    p.add_argument("--place-k", type=int, default=10, help="--map: neighbours interpolated per new point")
+    p.add_argument("--render", default="auto", choices=["auto", "scatter", "density", "hexbin"])
+    p.add_argument("--dense-above", type=int, default=50000, help="auto: density beyond this many points")
+    p.add_argument("--bins", type=int, default=400, help="density / hexbin resolution")
+    p.add_argument("--title")
+    p.add_argument("--out", help="image file (default: open a window)")
+    a = p.parse_args(argv)
+
+    sample = load_sample(a.sample)[0] if a.sample else {}
+    sets = []
+    for i, spec in enumerate(a.sets):
+        lang, role = (spec.split(":") + ["subject"])[:2]
+        if a.sample and f"{lang}_{role}" not in sample:
+            raise SystemExit(f"❌ {a.sample} has no rows for {lang}:{role}")
+        sets.append(EmbeddingSet(spec, a.emb_dir, i, sample.get(f"{lang}_{role}")))
+    vectors = [s.vectors for s in sets]
+    if a.map:
+        coords = place_rows(*vectors, map_path=a.map, k=a.place_k)
+    else:
+        coords = project_rows(*vectors, save_to=a.save_map, method=a.method, perplexity=a.perplexity,
+                              seed=a.seed, cache_dir=a.cache_dir or None)
+    for s, c in zip(sets, coords):
+        s.coords = c
+
+    highlights = list(a.highlight)
+    if a.highlight_file:
+        with open(a.highlight_file, encoding="utf-8") as f:
+            highlights += [line.rstrip("\n") for line in f if line.strip()]
+    missing = [h for h in highlights if all(s.find(h) < 0 for s in sets)]
+    if missing:
+        print(f"⚠️  not found in any set: {', '.join(missing)}")
+    plot(sets, highlights, a.render, a.dense_above, a.bins, a.title, a.out)
+
+
+if __name__ == "__main__":
+    main()